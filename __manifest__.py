@@ -1,6 +1,6 @@
 {
     'name': 'API Workflow Builder',
-    'version': '18.0.1.0',
+    'version': '18.0.1.2',
     'category': 'Tools',
     'summary': 'Drag and drop API workflow builder',
     'description': """
@@ -9,9 +9,12 @@
     """,
     'depends': ['base', 'web'],
     'data': [
+        'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         'views/workflow_views.xml',
+        'views/workflow_run_views.xml',
+        'views/workflow_node_views.xml',
         'views/workflow_menu.xml',
-        'security/ir.model.access.csv',
     ],
     'assets': {
         'web.assets_backend': [
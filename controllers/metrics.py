@@ -0,0 +1,28 @@
+import hmac
+
+from odoo import http
+from odoo.http import request
+
+from ..tools import instrumentation
+
+
+class APIWorkflowMetrics(http.Controller):
+
+    @http.route('/api_workflow/metrics', type='http', auth='public', methods=['GET'], csrf=False, save_session=False)
+    def metrics(self):
+        """
+        Prometheus scrape endpoint for the workflow request metrics, on when
+        api_workflow.metrics is set. Scrapers send api_workflow.metrics_token
+        as a Bearer token; settings managers can also open it logged in.
+        """
+        params = request.env['ir.config_parameter'].sudo()
+        instrumentation.configure(metrics=params.get_param('api_workflow.metrics', False))
+        if not instrumentation.metrics_enabled():
+            return request.not_found()
+        token = params.get_param('api_workflow.metrics_token')
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not (token and hmac.compare_digest(authorization, f'Bearer {token}')
+                or request.env.user.has_group('base.group_system')):
+            return request.make_response('Forbidden', status=403)
+        body, content_type = instrumentation.exposition()
+        return request.make_response(body, headers=[('Content-Type', content_type)])
@@ -0,0 +1,20 @@
+""" Fill the normalized node and connection tables from existing workflow_data blobs """
+import logging
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    workflows = env['api.workflow'].with_context(active_test=False).search([('workflow_data', '!=', False)])
+    for workflow in workflows:
+        compiled = workflow._get_compiled_workflow()
+        if compiled.error:
+            _logger.warning("Workflow %s not migrated: %s", workflow.id, compiled.error)
+            continue
+        workflow._sync_graph_rows(compiled.data)
+    _logger.info("Normalized nodes and connections of %s workflows", len(workflows))
@@ -0,0 +1,17 @@
+""" Flag the node results that never got a response, their 0 ms latency stays out of the percentiles """
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    cr.execute("""
+        UPDATE api_workflow_run_node
+           SET has_latency = FALSE
+         WHERE status = 'error'
+           AND COALESCE(latency_ms, 0) = 0
+           AND COALESCE(status_code, 0) = 0
+    """)
+    _logger.info("Flagged %s failed node results without a response", cr.rowcount)
@@ -1,2 +1,6 @@
 from . import workflow_testing
 from . import workflow
+from . import workflow_batch
+from . import workflow_monitor
+from . import workflow_run
+from . import workflow_node
@@ -3,6 +3,9 @@ from odoo import models, fields, api, exceptions
 import logging
 import json
 
+from ..tools.workflow_cache import workflow_cache, compile_workflow, CompiledWorkflow
+from ..tools.workflow_delta import apply_delta
+
 _logger = logging.getLogger(__name__)
 
 
@@ -14,8 +17,157 @@ class APIWorkflow(models.Model):
     name = fields.Char(string='Workflow Name', required=True)
     description = fields.Text(string='Description')
     workflow_data = fields.Text(string='Workflow Data')
+    version = fields.Integer(string='Version', default=1, readonly=True, copy=False,
+                             help='Incremented on every builder save, used to detect concurrent edits')
     active = fields.Boolean(string='Active', default=True)
     created_date = fields.Datetime(string='Created Date', default=fields.Datetime.now)
+    run_ids = fields.One2many('api.workflow.run', 'workflow_id', string='Test Runs')
+    node_ids = fields.One2many('api.workflow.node', 'workflow_id', string='Nodes')
+    connection_ids = fields.One2many('api.workflow.connection', 'workflow_id', string='Connections')
+    load_concurrency = fields.Integer(string='Virtual Users', default=4)
+    load_target_rps = fields.Float(string='Target Requests/sec', default=10.0,
+                                   help='Combined request rate, 0 for as fast as possible')
+    load_duration = fields.Integer(string='Duration (s)', default=30)
+    load_iterations = fields.Integer(string='Max Iterations', default=0,
+                                     help='Stop after this many workflow iterations, 0 for no limit')
+    load_test_result = fields.Text(string='Last Load Test Result', readonly=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if not self.env.context.get('skip_graph_sync'):
+            for record in records.filtered('workflow_data'):
+                record._sync_graph_rows()
+        return records
+
+    def write(self, vals):
+        dbname = self.env.cr.dbname
+        if 'workflow_data' in vals:
+            workflow_cache.invalidate(dbname, self.ids)
+            res = super().write(vals)
+            if not self.env.context.get('skip_graph_sync'):
+                for record in self:
+                    record._sync_graph_rows()
+            return res
+        # The document is unchanged: carry cached versions over to the new write_date
+        cached = {record.id: workflow_cache.get(dbname, record.id, record.write_date) for record in self}
+        res = super().write(vals)
+        for record in self:
+            if cached.get(record.id) is not None:
+                workflow_cache.put(dbname, record.id, record.write_date, cached[record.id])
+        return res
+
+    def _get_compiled_workflow(self, compiled=None):
+        """
+        Parsed and validated workflow_data of this record, served from the
+        per-worker cache while the record's write_date is unchanged.
+        A freshly compiled version may be passed in to seed the cache.
+        """
+        self.ensure_one()
+        dbname = self.env.cr.dbname
+        write_date = self.write_date
+        if compiled is None:
+            compiled = workflow_cache.get(dbname, self.id, write_date)
+            if compiled is not None:
+                return compiled
+            compiled = compile_workflow(self.workflow_data)
+        workflow_cache.put(dbname, self.id, write_date, compiled)
+        return compiled
+
+    def _sync_graph_rows(self, data=None, node_keys=None, connection_keys=None):
+        """
+        Mirror the nodes and connections of the workflow document into the
+        indexed api.workflow.node / api.workflow.connection rows.
+        Only rows whose content changed are written. When node_keys or
+        connection_keys are given, only those ids are looked at (used by
+        delta saves); None means the whole document.
+        """
+        self.ensure_one()
+        if data is None:
+            compiled = self._get_compiled_workflow() if self.workflow_data else CompiledWorkflow(None)
+            data = compiled.data or {}
+        Node = self.env['api.workflow.node']
+        Connection = self.env['api.workflow.connection']
+        nodes = data.get('nodes', [])
+        connections = data.get('connections', [])
+
+        endpoint = next((node for node in nodes if node.get('type') == 'endpoint'), None)
+        default_host = Node._host_of((endpoint or {}).get('config', {}).get('baseUrl'))
+
+        # 🧩 Nodes
+        node_domain = [('workflow_id', '=', self.id)]
+        if node_keys is not None:
+            node_keys = {str(key) for key in node_keys}
+            node_domain.append(('node_key', 'in', list(node_keys)))
+        existing = {row.node_key: row for row in Node.search(node_domain)}
+        to_create = []
+        seen = set()
+        for sequence, node in enumerate(nodes):
+            key = str(node.get('id'))
+            if (node_keys is not None and key not in node_keys) or key in seen:
+                continue
+            seen.add(key)
+            vals = Node._prepare_vals(node, sequence, default_host)
+            row = existing.get(key)
+            if row is None:
+                to_create.append(dict(vals, workflow_id=self.id))
+            elif any(row[name] != value for name, value in vals.items()):
+                row.write(vals)
+        Node.browse([row.id for key, row in existing.items() if key not in seen]).unlink()
+        Node.create(to_create)
+
+        # 🔗 Connections
+        connection_domain = [('workflow_id', '=', self.id)]
+        if connection_keys is not None:
+            connection_keys = {str(key) for key in connection_keys}
+            connection_domain.append(('connection_key', 'in', list(connection_keys)))
+        existing = {row.connection_key: row for row in Connection.search(connection_domain)}
+        ends = {str(connection.get(end)) for connection in connections for end in ('source', 'target')}
+        node_ids = {row.node_key: row.id for row in Node.search([('workflow_id', '=', self.id), ('node_key', 'in', list(ends))])}
+        to_create = []
+        seen = set()
+        for connection in connections:
+            key = Connection._key_of(connection)
+            if (connection_keys is not None and key not in connection_keys) or key in seen:
+                continue
+            seen.add(key)
+            vals = {
+                'connection_key': key,
+                'source_node_id': node_ids.get(str(connection.get('source')), False),
+                'target_node_id': node_ids.get(str(connection.get('target')), False),
+                'data': connection,
+            }
+            row = existing.get(key)
+            if row is None:
+                to_create.append(dict(vals, workflow_id=self.id))
+            elif row.data != connection or row.source_node_id.id != vals['source_node_id'] \
+                    or row.target_node_id.id != vals['target_node_id']:
+                row.write(vals)
+        Connection.browse([row.id for key, row in existing.items() if key not in seen]).unlink()
+        Connection.create(to_create)
+
+    def _export_workflow_data(self):
+        """Rebuild the builder JSON document from the normalized rows"""
+        self.ensure_one()
+        document = {
+            'nodes': [row.data for row in self.node_ids],
+            'connections': [row.data for row in self.connection_ids],
+        }
+        compiled = self._get_compiled_workflow() if self.workflow_data else None
+        if compiled and compiled.data and 'metadata' in compiled.data:
+            document['metadata'] = compiled.data['metadata']
+        return document
+
+    @api.model
+    def export_workflow_data(self, workflow_id):
+        """
+        Export a saved workflow in the JSON shape used by the builder's
+        import/export
+        """
+        workflow = self.browse(workflow_id).exists()
+        if not workflow:
+            raise exceptions.UserError("Workflow not found!")
+        return workflow._export_workflow_data()
 
     def open_workflow_builder(self):
         """
@@ -23,7 +175,6 @@ class APIWorkflow(models.Model):
         """
         print('open_workflow_builder')
         self.ensure_one()
-        print(self.workflow_data)
         # Return action to open workflow builder
         return {
             'type': 'ir.actions.client',
@@ -31,7 +182,8 @@ class APIWorkflow(models.Model):
             'name': f'Workflow Builder - {self.name}',
             'params': {
                 'workflow_id': self.id,
-                'workflow_data': json.loads(self.workflow_data) if self.workflow_data else {},
+                'workflow_version': self.version,
+                'workflow_data': self._get_compiled_workflow().data if self.workflow_data else {},
                 'workflow_name': self.name,
             },
             # 'target': 'fullscreen', # Optional: make it readonly
@@ -48,8 +200,12 @@ class APIWorkflow(models.Model):
             raise exceptions.UserError("No workflow data to test!")
 
         try:
-            workflow_json = json.loads(self.workflow_data)
-            result = self.test_workflow(workflow_json)
+            compiled = self._get_compiled_workflow()
+            if compiled.error:
+                raise exceptions.UserError(compiled.error)
+            workflow_json = compiled.data
+            result = self._execute_workflow(workflow_json, graph=compiled.graph)
+            self.env['api.workflow.run']._create_from_result(result, workflow_json, self.id)
 
             # Show notification based on result
             if result.get('success'):
@@ -73,6 +229,52 @@ class APIWorkflow(models.Model):
         except Exception as e:
             raise exceptions.UserError(f"Failed to test workflow: {str(e)}")
 
+    def action_test_workflow_async(self):
+        """
+        Queue the workflow test in the background and open the run
+        """
+        self.ensure_one()
+
+        if not self.workflow_data:
+            raise exceptions.UserError("No workflow data to test!")
+
+        run_id = self.env['api.workflow.run'].enqueue(self.workflow_data, self.id)
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'api.workflow.run',
+            'res_id': run_id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    def action_run_load_test(self):
+        """
+        Queue a load test with the record's load settings and open the run
+        """
+        self.ensure_one()
+
+        if not self.workflow_data:
+            raise exceptions.UserError("No workflow data to test!")
+
+        compiled = self._get_compiled_workflow()
+        if compiled.error:
+            raise exceptions.UserError(compiled.error)
+        run_id = self.env['api.workflow.run'].enqueue_load_test(
+            compiled.data,
+            self.id,
+            concurrency=self.load_concurrency,
+            target_rps=self.load_target_rps,
+            duration=self.load_duration,
+            iterations=self.load_iterations,
+        )
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'api.workflow.run',
+            'res_id': run_id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
     def load_workflow_to_builder(self):
         """
         Load this workflow into the workflow builder
@@ -103,33 +305,119 @@ class APIWorkflow(models.Model):
         """
         record_id = vals.get('id')
         workflow_data = vals.get('workflow_data')
+        base_version = vals.pop('version', None)
 
-        # Validate JSON
+        # Validate JSON, the parsed result seeds the compiled workflow cache
+        compiled = None
         if workflow_data:
-            try:
-                workflow_json = json.loads(workflow_data)
-                if not workflow_json.get('nodes'):
-                    raise exceptions.ValidationError("Workflow must contain at least one node")
-                _logger.info("Parsed workflow JSON with %s nodes", len(workflow_json.get('nodes', [])))
-            except json.JSONDecodeError as e:
-                raise exceptions.ValidationError(("Invalid workflow data format: %s") % str(e))
+            compiled = compile_workflow(workflow_data)
+            if compiled.error:
+                raise exceptions.ValidationError(compiled.error)
+            _logger.info("Parsed workflow JSON with %s nodes", len(compiled.data['nodes']))
 
         # 🧩 If ID exists → update existing record
         if record_id:
             existing = self.browse(record_id)
             if existing.exists():
                 _logger.info("Updating existing workflow ID %s", record_id)
-                existing.write(vals)
+                if existing._bump_version(base_version) is None:
+                    raise exceptions.ValidationError(
+                        "This workflow was saved by someone else in the meantime, reload it before saving.")
+                existing.with_context(skip_graph_sync=True).write(vals)
+                if compiled:
+                    existing._get_compiled_workflow(compiled)
+                    existing._sync_graph_rows(compiled.data)
                 return existing.id
 
         # 🆕 Otherwise → create a new workflow
         if not vals.get('name'):
             vals['name'] = self._generate_default_name()
 
-        new_record = self.create(vals)
+        new_record = self.with_context(skip_graph_sync=True).create(vals)
+        if compiled:
+            new_record._get_compiled_workflow(compiled)
+            new_record._sync_graph_rows(compiled.data)
         _logger.info("Created new workflow ID %s", new_record.id)
         return new_record.id
 
+    @api.model
+    def save_workflow_delta(self, workflow_id, base_version, ops):
+        """
+        Apply node/connection add, update and remove operations (see
+        tools.workflow_delta.apply_delta) to a saved workflow.
+        base_version is the version the client edited; when the record has
+        moved on since, nothing is applied and the current version is
+        returned with status 'conflict'.
+        """
+        workflow = self.browse(workflow_id).exists()
+        if not workflow:
+            raise exceptions.UserError("Workflow not found!")
+
+        compiled = workflow._get_compiled_workflow()
+        if workflow.workflow_data and compiled.error:
+            raise exceptions.ValidationError(compiled.error)
+
+        new_version = workflow._bump_version(base_version)
+        if new_version is None:
+            _logger.info("Delta save conflict on workflow %s (client version %s, current %s)",
+                         workflow_id, base_version, workflow.version)
+            return {'status': 'conflict', 'version': workflow.version}
+
+        try:
+            data = apply_delta(compiled.data or {'nodes': [], 'connections': []}, ops)
+        except ValueError as e:
+            raise exceptions.ValidationError(str(e))
+        if not data.get('nodes'):
+            raise exceptions.ValidationError("Workflow must contain at least one node")
+
+        workflow.with_context(skip_graph_sync=True).write({'workflow_data': json.dumps(data)})
+        # The new document is already parsed, seed the cache with it
+        workflow._get_compiled_workflow(CompiledWorkflow(data))
+        workflow._sync_delta_rows(compiled.data or {}, data, ops)
+        _logger.info("Applied %s delta operations to workflow %s (version %s)", len(ops), workflow_id, new_version)
+        return {'status': 'ok', 'version': new_version}
+
+    def _sync_delta_rows(self, before, after, ops):
+        """Update only the node/connection rows touched by a delta"""
+        node_keys = set()
+        connection_keys = set()
+        for op in ops:
+            if op.get('op') in ('add_node', 'update_node'):
+                node_keys.add(op['node'].get('id'))
+            elif op.get('op') == 'remove_node':
+                node_keys.add(op.get('id'))
+            elif op.get('op') == 'add_connection':
+                connection_keys.add(self.env['api.workflow.connection']._key_of(op['connection']))
+            elif op.get('op') == 'remove_connection':
+                connection_keys.add(op.get('id'))
+        touches_endpoint = any(
+            node.get('type') == 'endpoint' and node.get('id') in node_keys
+            for document in (before, after) for node in document.get('nodes', []))
+        if touches_endpoint:
+            # Relative API nodes take their host from the endpoint, re-check them all
+            self._sync_graph_rows(after)
+        elif node_keys or connection_keys:
+            # Connections of removed nodes go away with them (ondelete cascade)
+            self._sync_graph_rows(after, node_keys=node_keys, connection_keys=connection_keys)
+
+    def _bump_version(self, expected=None):
+        """
+        Atomically increment the version, only if it still equals expected
+        (when given). Returns the new version, or None on a conflict.
+        """
+        self.ensure_one()
+        self.flush_recordset(['version'])
+        if expected is None:
+            self.env.cr.execute(
+                "UPDATE api_workflow SET version = version + 1 WHERE id = %s RETURNING version", [self.id])
+        else:
+            self.env.cr.execute(
+                "UPDATE api_workflow SET version = version + 1 WHERE id = %s AND version = %s RETURNING version",
+                [self.id, expected])
+        row = self.env.cr.fetchone()
+        self.invalidate_recordset(['version'])
+        return row[0] if row else None
+
     def _generate_default_name(self):
         """Generate a unique default name."""
         print('_generate_default_name')
@@ -0,0 +1,129 @@
+""" Testing many saved workflows in one call """
+from odoo import models, api, exceptions
+import logging
+import time
+
+from ..tools import oauth2
+from ..tools.batch import RequestBatch, DEFAULT_MAX_REQUESTS, DEFAULT_MAX_PER_HOST
+
+_logger = logging.getLogger(__name__)
+
+# Workflows of a batch running at the same time, overridable with api_workflow.batch_parallelism
+DEFAULT_BATCH_PARALLELISM = 8
+MAX_BATCH_PARALLELISM = 64
+
+
+class APIWorkflowBatch(models.Model):
+    _inherit = 'api.workflow'
+
+    @api.model
+    def batch_test_workflows(self, workflow_ids=None, record_runs=False):
+        """
+        RPC: test many workflows at once, all active ones with data when
+        workflow_ids is not given. Returns a compact summary per workflow.
+        """
+        if workflow_ids:
+            workflows = self.browse(workflow_ids).exists()
+        else:
+            workflows = self.search([('workflow_data', '!=', False)])
+        return workflows._batch_test(record_runs=record_runs)
+
+    def _batch_test(self, record_runs=False):
+        """
+        Test these workflows together: one pool configuration, the shared
+        token cache, global request limits (api_workflow.batch_max_requests
+        overall, api_workflow.batch_max_per_host per host) and every
+        identical GET sent once for the whole batch.
+        """
+        started = time.perf_counter()
+        parallelism = self._get_int_param('api_workflow.batch_parallelism', DEFAULT_BATCH_PARALLELISM,
+                                          MAX_BATCH_PARALLELISM)
+        batch = RequestBatch(
+            max_requests=self._get_int_param('api_workflow.batch_max_requests', DEFAULT_MAX_REQUESTS),
+            max_per_host=self._get_int_param('api_workflow.batch_max_per_host', DEFAULT_MAX_PER_HOST),
+        )
+        self._configure_http_pool(min_pool_size=batch.max_per_host)
+        self._configure_response_cache()
+        tokens_before = oauth2.stats()['fetches']
+
+        summaries = {}
+        jobs = {}
+        for workflow in self:
+            compiled = workflow._get_compiled_workflow() if workflow.workflow_data else None
+            if compiled is None or compiled.error:
+                summaries[workflow.id] = workflow._batch_summary(
+                    {'success': False, 'error': compiled.error if compiled else 'No workflow data to test!'}, 0.0)
+                continue
+            jobs[workflow.id] = compiled
+
+        def on_result(workflow_id, compiled, result, duration):
+            summaries[workflow_id] = self.browse(workflow_id)._batch_summary(result, duration)
+            if record_runs:
+                self.env['api.workflow.run']._create_from_result(result, compiled.data, workflow_id)
+
+        self._run_workflows_parallel(jobs, parallelism, on_result, batch)
+
+        results = [summaries[workflow.id] for workflow in self]
+        passed = len([summary for summary in results if summary['status'] == 'passed'])
+        report = {
+            'success': True,
+            'workflows': len(results),
+            'passed': passed,
+            'failed': len(results) - passed,
+            'requests': batch.requests,
+            'deduplicated': batch.deduplicated,
+            'token_fetches': oauth2.stats()['fetches'] - tokens_before,
+            'duration_ms': round((time.perf_counter() - started) * 1000.0, 1),
+            'results': results,
+        }
+        _logger.info("Batch test of %s workflows: %s passed, %s requests (%s deduplicated) in %sms",
+                     report['workflows'], passed, report['requests'], report['deduplicated'], report['duration_ms'])
+        return report
+
+    def _batch_summary(self, result, duration):
+        """Compact outcome of one workflow of a batch"""
+        self.ensure_one()
+        api_results = [r for r in result.get('results', []) if r.get('status') != 'skipped']
+        failed = [r for r in api_results if r.get('status') == 'error']
+        passed = bool(result.get('success')) and not failed
+        if passed:
+            message = result.get('message')
+        elif failed:
+            message = f"{failed[0].get('node_id')}: {failed[0].get('message')}"
+        else:
+            message = result.get('error')
+        return {
+            'workflow_id': self.id,
+            'name': self.name,
+            'status': 'passed' if passed else 'failed',
+            'nodes': len(api_results),
+            'failed_nodes': len(failed),
+            'deduplicated': len([r for r in api_results if r.get('deduplicated')]),
+            'duration_ms': round(duration * 1000.0, 1),
+            'message': message,
+        }
+
+    def action_batch_test(self):
+        """
+        Server action: test the selected workflows together, recording a
+        test run for each
+        """
+        workflows = self.filtered('workflow_data')
+        if not workflows:
+            raise exceptions.UserError("No workflow data to test!")
+        report = workflows._batch_test(record_runs=True)
+        failed = [summary['name'] for summary in report['results'] if summary['status'] == 'failed']
+        message = (f"{report['passed']}/{report['workflows']} workflows passed in {report['duration_ms'] / 1000.0:.1f}s, "
+                   f"{report['requests']} requests ({report['deduplicated']} deduplicated)")
+        if failed:
+            message += f". Failed: {', '.join(failed[:10])}{'...' if len(failed) > 10 else ''}"
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Batch Test Result',
+                'message': message,
+                'type': 'success' if not failed else 'warning',
+                'sticky': True,
+            }
+        }
@@ -0,0 +1,154 @@
+""" Scheduled headless runs of saved workflows as uptime and latency monitors """
+from odoo import models, fields, api
+import logging
+
+from ..tools import scheduling
+from .workflow_run import STALE_RUN_TIMEOUT
+from .workflow_testing import DEFAULT_MAX_CONCURRENCY_PER_HOST
+
+_logger = logging.getLogger(__name__)
+
+# Due monitors claimed per cron pass before the cron re-triggers itself
+MONITORS_PER_CRON_PASS = 50
+# Monitors of a pass running at the same time, overridable with api_workflow.monitor_parallelism
+DEFAULT_MONITOR_PARALLELISM = 4
+MAX_MONITOR_PARALLELISM = 32
+
+
+class APIWorkflowMonitor(models.Model):
+    _inherit = 'api.workflow'
+
+    monitor_active = fields.Boolean(string='Run as Monitor', default=False,
+                                    help='Run the workflow on a schedule, recording every run')
+    monitor_interval = fields.Integer(string='Interval (min)', default=5)
+    monitor_next_run = fields.Datetime(string='Next Monitor Run', readonly=True, copy=False, index=True)
+    monitor_running_since = fields.Datetime(string='Monitor Run Started', readonly=True, copy=False)
+    monitor_last_run = fields.Datetime(string='Last Monitor Run', readonly=True, copy=False)
+    monitor_last_status = fields.Selection([
+        ('up', 'Up'),
+        ('down', 'Down'),
+    ], string='Monitor Status', readonly=True, copy=False)
+    monitor_last_duration_ms = fields.Float(string='Last Run Duration (ms)', readonly=True, copy=False)
+    monitor_last_message = fields.Char(string='Last Monitor Message', readonly=True, copy=False)
+    monitor_skipped_runs = fields.Integer(string='Skipped Runs', readonly=True, copy=False,
+                                          help='Scheduled runs skipped because the previous one was still in flight')
+
+    _sql_constraints = [
+        ('monitor_interval_positive', 'CHECK(monitor_interval > 0)',
+         'The monitor interval must be at least one minute.'),
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.filtered('monitor_active')._schedule_monitor()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'monitor_active' in vals or 'monitor_interval' in vals:
+            self.filtered('monitor_active')._schedule_monitor()
+            self.filtered(lambda workflow: not workflow.monitor_active).monitor_next_run = False
+        return res
+
+    def _schedule_monitor(self, now=None):
+        """
+        Set the next run of each monitor. Every workflow keeps a fixed
+        phase within its interval, derived from its id, so monitors sharing
+        an interval are spread across it rather than all due at once.
+        """
+        now = now or fields.Datetime.now()
+        for workflow in self:
+            interval = workflow.monitor_interval * 60
+            workflow.monitor_next_run = scheduling.next_run(
+                now, interval, scheduling.phase_offset(workflow.id, interval))
+
+    @api.model
+    def _cron_run_monitors(self):
+        """
+        Run the monitors that are due. Up to MONITORS_PER_CRON_PASS of them
+        are claimed in one transaction, SKIP LOCKED letting other workers
+        take the rest, then run in parallel over the shared connection
+        pools. A monitor whose previous run is still in flight skips its slot.
+        """
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            SELECT id FROM api_workflow
+             WHERE monitor_active AND active
+               AND monitor_next_run <= %s
+             ORDER BY monitor_next_run
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [now, MONITORS_PER_CRON_PASS])
+        due = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if not due:
+            return
+        in_flight = due.filtered(lambda workflow: workflow.monitor_running_since
+                                 and workflow.monitor_running_since > now - STALE_RUN_TIMEOUT)
+        for workflow in in_flight:
+            _logger.info("Monitor %s skipped: its previous run is still in flight", workflow.id)
+            workflow.monitor_skipped_runs += 1
+        due._schedule_monitor(now)
+        claimed = due - in_flight
+        claimed.write({'monitor_running_since': now})
+        # Release the row locks, monitor_running_since now keeps other passes off
+        self.env.cr.commit()
+        try:
+            claimed._run_monitors()
+        except Exception:
+            _logger.exception("Monitor pass crashed")
+            self.env.cr.rollback()
+            claimed.exists().write({'monitor_running_since': False})
+            self.env.cr.commit()
+        if len(due) == MONITORS_PER_CRON_PASS:
+            # More monitors may be due, schedule another pass right away
+            self.env.ref('api_workflow.ir_cron_run_monitors')._trigger()
+
+    def _run_monitors(self):
+        """
+        Execute these workflows headless, at most
+        api_workflow.monitor_parallelism at a time, committing each result
+        as soon as it comes in.
+        """
+        parallelism = self._get_int_param('api_workflow.monitor_parallelism', DEFAULT_MONITOR_PARALLELISM,
+                                          MAX_MONITOR_PARALLELISM)
+        # One pool configuration for the batch, sized for every monitor calling the same host
+        self._configure_http_pool(min_pool_size=parallelism * DEFAULT_MAX_CONCURRENCY_PER_HOST)
+        self._configure_response_cache()
+        jobs = {}
+        for workflow in self:
+            compiled = workflow._get_compiled_workflow() if workflow.workflow_data else None
+            if compiled is None or compiled.error:
+                error = compiled.error if compiled else 'No workflow data to test!'
+                workflow._record_monitor_result({'success': False, 'error': error, 'results': []}, {}, 0.0)
+                self.env.cr.commit()
+                continue
+            jobs[workflow.id] = compiled
+
+        def on_result(workflow_id, compiled, result, duration):
+            self.browse(workflow_id)._record_monitor_result(result, compiled.data, duration)
+            self.env.cr.commit()
+
+        self._run_workflows_parallel(jobs, parallelism, on_result)
+
+    def _record_monitor_result(self, result, workflow_data, duration):
+        """Store a monitor run as a test run and update the monitor status"""
+        self.ensure_one()
+        failed = [r for r in result.get('results', []) if r.get('status') == 'error']
+        up = bool(result.get('success')) and not failed
+        if up:
+            message = result.get('message')
+        elif failed:
+            message = f"{len(failed)} failing nodes, first: {failed[0].get('message')}"
+        else:
+            message = result.get('error')
+        self.env['api.workflow.run']._create_from_result(result, workflow_data, self.id, run_type='monitor')
+        self.write({
+            'monitor_running_since': False,
+            'monitor_last_run': fields.Datetime.now(),
+            'monitor_last_status': 'up' if up else 'down',
+            'monitor_last_duration_ms': duration * 1000.0,
+            'monitor_last_message': message,
+        })
+        if not up:
+            _logger.warning("Monitor %s (%s) is down: %s", self.id, self.name, message)
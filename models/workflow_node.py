@@ -0,0 +1,65 @@
+""" normalized workflow node and connection models """
+from odoo import models, fields, api
+from urllib.parse import urlparse
+
+
+class APIWorkflowNode(models.Model):
+    _name = 'api.workflow.node'
+    _description = 'API Workflow Node'
+    _order = 'workflow_id, sequence, id'
+    _rec_name = 'node_key'
+
+    workflow_id = fields.Many2one('api.workflow', string='Workflow', required=True, ondelete='cascade', index=True)
+    node_key = fields.Char(string='Node ID', required=True, index=True)
+    sequence = fields.Integer(string='Sequence', default=0)
+    node_type = fields.Char(string='Type', index=True)
+    url = fields.Char(string='URL')
+    host = fields.Char(string='Host', index=True)
+    auth_type = fields.Char(string='Auth Type', index=True)
+    data = fields.Json(string='Node Data')
+
+    _sql_constraints = [
+        ('workflow_node_key_uniq', 'unique(workflow_id, node_key)', 'Node IDs must be unique within a workflow.'),
+    ]
+
+    @api.model
+    def _host_of(self, url):
+        """Lower-cased host[:port] of an absolute URL, False otherwise"""
+        netloc = urlparse(url or '').netloc
+        return netloc.lower() if netloc else False
+
+    @api.model
+    def _prepare_vals(self, node, sequence, default_host):
+        """Indexed columns extracted from a builder node dict"""
+        config = node.get('config') or {}
+        url = config.get('baseUrl') if node.get('type') == 'endpoint' else config.get('url')
+        host = self._host_of(url)
+        if not host and node.get('type') in ('get', 'post', 'put', 'delete', 'paginate'):
+            # Relative paths are resolved against the workflow's endpoint
+            host = default_host
+        return {
+            'node_key': str(node.get('id')),
+            'sequence': sequence,
+            'node_type': node.get('type'),
+            'url': url or False,
+            'host': host or False,
+            'auth_type': config.get('authType') if config.get('authType') not in (None, 'none') else False,
+            'data': node,
+        }
+
+
+class APIWorkflowConnection(models.Model):
+    _name = 'api.workflow.connection'
+    _description = 'API Workflow Connection'
+    _order = 'workflow_id, id'
+    _rec_name = 'connection_key'
+
+    workflow_id = fields.Many2one('api.workflow', string='Workflow', required=True, ondelete='cascade', index=True)
+    connection_key = fields.Char(string='Connection ID', required=True, index=True)
+    source_node_id = fields.Many2one('api.workflow.node', string='Source', ondelete='cascade', index=True)
+    target_node_id = fields.Many2one('api.workflow.node', string='Target', ondelete='cascade', index=True)
+    data = fields.Json(string='Connection Data')
+
+    @api.model
+    def _key_of(self, connection):
+        return str(connection.get('id') or f"{connection.get('source')}->{connection.get('target')}")
@@ -0,0 +1,425 @@
+""" workflow run model """
+from odoo import models, fields, api, exceptions, tools
+from datetime import timedelta
+from urllib.parse import urlparse
+import logging
+import json
+
+_logger = logging.getLogger(__name__)
+
+# Runs picked up per cron pass before the cron re-triggers itself
+RUNS_PER_CRON_PASS = 5
+# A run still 'running' after this long lost its worker and is failed
+STALE_RUN_TIMEOUT = timedelta(hours=1)
+# Monitor runs kept per workflow, and for how long, overridable with
+# api_workflow.monitor_run_retention_count and api_workflow.monitor_run_retention_days
+DEFAULT_MONITOR_RUN_RETENTION_COUNT = 1000
+DEFAULT_MONITOR_RUN_RETENTION_DAYS = 7
+# Monitor runs deleted per cron pass before the cron re-triggers itself
+MONITOR_RUNS_PER_GC_PASS = 5000
+# Spooled body attachments no run claimed are deleted after this long
+UNCLAIMED_BODY_TIMEOUT = timedelta(days=1)
+# Node result keys kept in a run's result_data, response bodies and headers stay out
+RESULT_NODE_KEYS = ('node_id', 'node_type', 'status', 'message', 'url', 'status_code', 'response_time',
+                    'body_size', 'body_url', 'cache', 'attempts', 'error_type', 'deduplicated')
+
+
+class APIWorkflowRun(models.Model):
+    _name = 'api.workflow.run'
+    _description = 'API Workflow Run'
+    _order = 'id desc'
+
+    name = fields.Char(string='Run', compute='_compute_name')
+    workflow_id = fields.Many2one('api.workflow', string='Workflow', ondelete='cascade', index=True)
+    workflow_data = fields.Text(string='Workflow Data')
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='State', default='queued', required=True, index=True)
+    run_type = fields.Selection([
+        ('test', 'Test'),
+        ('load', 'Load Test'),
+        ('monitor', 'Monitor'),
+    ], string='Type', default='test', required=True, index=True)
+    load_options = fields.Text(string='Load Test Options')
+    total_nodes = fields.Integer(string='Total Nodes')
+    completed_nodes = fields.Integer(string='Completed Nodes')
+    progress = fields.Float(string='Progress (%)', compute='_compute_progress')
+    message = fields.Char(string='Message')
+    result_data = fields.Text(string='Result Data')
+    started_at = fields.Datetime(string='Started At')
+    finished_at = fields.Datetime(string='Finished At')
+    node_ids = fields.One2many('api.workflow.run.node', 'run_id', string='Node Results')
+
+    @api.depends('workflow_id.name')
+    def _compute_name(self):
+        for run in self:
+            run.name = f"{run.workflow_id.name or 'Workflow'} - Run #{run.id or ''}"
+
+    @api.depends('total_nodes', 'completed_nodes')
+    def _compute_progress(self):
+        for run in self:
+            run.progress = 100.0 * run.completed_nodes / run.total_nodes if run.total_nodes else 0.0
+
+    @api.model
+    def enqueue(self, workflow_data, workflow_id=False):
+        """
+        Queue a workflow for background execution and wake up the cron.
+        Returns the new run id to poll with get_run_progress.
+        """
+        if isinstance(workflow_data, str):
+            workflow_data = json.loads(workflow_data)
+        if not workflow_data.get('nodes'):
+            raise exceptions.UserError("No workflow data to test!")
+        run = self.create({
+            'workflow_id': workflow_id,
+            'workflow_data': json.dumps(workflow_data),
+            'total_nodes': len(workflow_data['nodes']),
+        })
+        self.env.ref('api_workflow.ir_cron_process_workflow_runs')._trigger()
+        _logger.info("Queued workflow run %s", run.id)
+        return run.id
+
+    @api.model
+    def enqueue_load_test(self, workflow_data, workflow_id=False, **options):
+        """
+        Queue a load test (options as for load_test_workflow) for the
+        cron, away from the HTTP worker's time limit. Returns the run id.
+        """
+        run = self.browse(self.enqueue(workflow_data, workflow_id))
+        run.write({'run_type': 'load', 'load_options': json.dumps(options)})
+        return run.id
+
+    @api.model
+    def get_run_progress(self, run_id):
+        """
+        Poll endpoint for the builder: run state plus per-node progress
+        """
+        run = self.browse(run_id).exists()
+        if not run:
+            raise exceptions.UserError("Workflow run not found!")
+        progress = {
+            'id': run.id,
+            'state': run.state,
+            'total_nodes': run.total_nodes,
+            'completed_nodes': run.completed_nodes,
+            'progress': run.progress,
+            'message': run.message,
+            'nodes': [{
+                'node_id': line.node_id,
+                'node_type': line.node_type,
+                'status': line.status,
+                'message': line.message,
+            } for line in run.node_ids],
+        }
+        if run.state in ('done', 'failed') and run.result_data:
+            progress['result'] = json.loads(run.result_data)
+        return progress
+
+    @api.model
+    def _cron_process_runs(self):
+        """
+        Execute queued runs one by one, each in its own transaction.
+        SKIP LOCKED lets several workers drain the queue in parallel.
+        """
+        self._fail_stale_runs()
+        self.env.cr.commit()
+        for _i in range(RUNS_PER_CRON_PASS):
+            # Lock one run at a time: _execute commits, which releases locks
+            self.env.cr.execute("""
+                SELECT id FROM api_workflow_run
+                 WHERE state = 'queued'
+                 ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+            """)
+            row = self.env.cr.fetchone()
+            if not row:
+                return
+            run = self.browse(row[0])
+            run._execute()
+            self.env.cr.commit()
+            if run.run_type == 'load':
+                # A load test may use most of the cron's time limit on its own
+                break
+        # More work may be waiting, schedule another pass right away
+        self.env.ref('api_workflow.ir_cron_process_workflow_runs')._trigger()
+
+    def _fail_stale_runs(self):
+        stale = self.search([
+            ('state', '=', 'running'),
+            ('started_at', '<', fields.Datetime.now() - STALE_RUN_TIMEOUT),
+        ])
+        if stale:
+            stale.write({
+                'state': 'failed',
+                'message': 'Run interrupted before completion',
+                'finished_at': fields.Datetime.now(),
+            })
+
+    def _execute(self):
+        """Execute this run, committing progress after every graph level"""
+        self.ensure_one()
+        self.write({'state': 'running', 'started_at': fields.Datetime.now()})
+        self.env.cr.commit()
+        if self.run_type == 'load':
+            return self._execute_load_test()
+        try:
+            workflow_data = json.loads(self.workflow_data or '{}')
+            result = self.env['api.workflow.testing']._execute_workflow(
+                workflow_data, progress_callback=self._record_progress)
+        except Exception as e:
+            _logger.exception("Workflow run %s crashed", self.id)
+            self.env.cr.rollback()
+            result = {'success': False, 'error': str(e), 'results': []}
+        self.write({
+            'state': 'done' if result.get('success') else 'failed',
+            'message': result.get('message') if result.get('success') else result.get('error'),
+            'result_data': self._compact_result(result),
+            'finished_at': fields.Datetime.now(),
+        })
+        self._link_body_attachments(result)
+
+    def _execute_load_test(self):
+        """Run a queued load test, its report kept on the run and on the workflow"""
+        try:
+            report = self.env['api.workflow.testing'].with_context(api_workflow_background=True).load_test_workflow(
+                json.loads(self.workflow_data or '{}'), **json.loads(self.load_options or '{}'))
+        except Exception as e:
+            _logger.exception("Load test run %s crashed", self.id)
+            self.env.cr.rollback()
+            report = {'success': False, 'error': str(e)}
+        if report.get('success'):
+            latency = report['latency_ms']
+            message = (f"{report['requests']} requests at {report['throughput_rps']} req/s, "
+                       f"p95 {latency['p95'] or 0:.0f} ms, {report['failures']} failures "
+                       f"({report['timeouts']} timeouts)")
+        else:
+            message = f"Load test failed: {report.get('error')}"
+        report_json = json.dumps(report, indent=2, default=str)
+        self.write({
+            'state': 'done' if report.get('success') else 'failed',
+            'message': message,
+            'result_data': report_json,
+            'finished_at': fields.Datetime.now(),
+        })
+        if self.workflow_id:
+            self.workflow_id.load_test_result = report_json
+
+    @api.model
+    def _create_from_result(self, result, workflow_data, workflow_id=False, run_type='test'):
+        """
+        Persist a finished synchronous test as a run; the node lines are
+        inserted in one batch together with the run.
+        """
+        results = result.get('results', [])
+        run = self.create({
+            'workflow_id': workflow_id,
+            'run_type': run_type,
+            'workflow_data': json.dumps(workflow_data),
+            'state': 'done' if result.get('success') else 'failed',
+            'message': result.get('message') if result.get('success') else result.get('error'),
+            'result_data': self._compact_result(result),
+            'total_nodes': len(workflow_data.get('nodes', [])),
+            'completed_nodes': len(results),
+            'started_at': fields.Datetime.now(),
+            'finished_at': fields.Datetime.now(),
+            'node_ids': [(0, 0, self._prepare_node_vals(node_result)) for node_result in results],
+        })
+        run._link_body_attachments(result)
+        return run
+
+    def _link_body_attachments(self, result):
+        """Attach the spooled bodies of a result to this run, they go when it is deleted"""
+        self.ensure_one()
+        attachment_ids = [node_result['body_attachment_id'] for node_result in result.get('results', [])
+                          if node_result.get('body_attachment_id')]
+        if attachment_ids:
+            self.env['ir.attachment'].sudo().browse(attachment_ids).write({'res_id': self.id})
+
+    @api.autovacuum
+    def _gc_unclaimed_body_attachments(self):
+        """Delete spooled body attachments of tests that were never recorded as a run"""
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', False),
+            ('create_date', '<', fields.Datetime.now() - UNCLAIMED_BODY_TIMEOUT),
+        ]).unlink()
+
+    @api.model
+    def _compact_result(self, result):
+        """JSON of an engine result for result_data: the run summary and each node's outcome"""
+        compact = {key: value for key, value in result.items() if key != 'results'}
+        compact['results'] = [{key: node_result[key] for key in RESULT_NODE_KEYS if key in node_result}
+                              for node_result in result.get('results', [])]
+        return json.dumps(compact, default=str)
+
+    @api.model
+    def _cron_gc_monitor_runs(self):
+        """
+        Delete monitor runs beyond the newest
+        api_workflow.monitor_run_retention_count of each workflow or older
+        than api_workflow.monitor_run_retention_days; their node lines
+        follow through the cascade.
+        """
+        testing = self.env['api.workflow.testing']
+        keep_count = testing._get_int_param('api_workflow.monitor_run_retention_count',
+                                            DEFAULT_MONITOR_RUN_RETENTION_COUNT)
+        keep_days = testing._get_int_param('api_workflow.monitor_run_retention_days',
+                                           DEFAULT_MONITOR_RUN_RETENTION_DAYS)
+        self.env.cr.execute("""
+            DELETE FROM api_workflow_run
+             WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, create_date,
+                           row_number() OVER (PARTITION BY workflow_id ORDER BY id DESC) AS position
+                      FROM api_workflow_run
+                     WHERE run_type = 'monitor'
+                ) monitor_runs
+                 WHERE position > %s
+                    OR create_date < now() at time zone 'UTC' - %s * interval '1 day'
+                 LIMIT %s
+             )
+        """, [keep_count, keep_days, MONITOR_RUNS_PER_GC_PASS])
+        deleted = self.env.cr.rowcount
+        if deleted:
+            _logger.info("Deleted %s old monitor runs", deleted)
+            self.invalidate_model()
+        if deleted == MONITOR_RUNS_PER_GC_PASS:
+            # More may be left, schedule another pass right away
+            self.env.ref('api_workflow.ir_cron_gc_monitor_runs')._trigger()
+
+    @api.model
+    def get_latency_percentiles(self, workflow_id, endpoint=None, days=None):
+        """
+        p50/p95/p99 latency (ms) and error rate of the API calls of a
+        workflow, optionally narrowed to one endpoint and the last N days.
+        Cache hits are left out as they never reached the API, calls that
+        failed without a response count as errors but have no latency.
+        """
+        where = ["workflow_id = %s", "status IN ('success', 'error')", "cached IS NOT TRUE"]
+        args = [workflow_id]
+        if endpoint:
+            where.append("endpoint = %s")
+            args.append(endpoint)
+        if days:
+            where.append("create_date >= now() at time zone 'UTC' - %s * interval '1 day'")
+            args.append(days)
+        self.env['api.workflow.run.node'].flush_model()
+        self.env.cr.execute(f"""
+            SELECT count(*),
+                   count(*) FILTER (WHERE status = 'error'),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE has_latency),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE has_latency),
+                   percentile_cont(0.99) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE has_latency),
+                   avg(body_size)
+              FROM api_workflow_run_node
+             WHERE {' AND '.join(where)}
+        """, args)
+        calls, errors, p50, p95, p99, avg_bytes = self.env.cr.fetchone()
+        return {
+            'calls': calls,
+            'errors': errors,
+            'error_rate': 100.0 * errors / calls if calls else 0.0,
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+            'avg_bytes': float(avg_bytes) if avg_bytes is not None else None,
+        }
+
+    def _record_progress(self, level_results):
+        """Store the results of one finished level with a single batched insert"""
+        self.env['api.workflow.run.node'].create([
+            self._prepare_node_vals(result) for result in level_results
+        ])
+        self.completed_nodes += len(level_results)
+        self.env.cr.commit()
+
+    def _prepare_node_vals(self, result):
+        url = result.get('url')
+        response_time = result.get('response_time')
+        vals = {
+            'node_id': result.get('node_id'),
+            'node_type': result.get('node_type'),
+            'status': result.get('status') if result.get('status') in ('success', 'error', 'skipped') else 'error',
+            'message': result.get('message'),
+            'url': url,
+            'endpoint': urlparse(url)._replace(query='', fragment='').geturl() if url else False,
+            'status_code': result.get('status_code') or 0,
+            'latency_ms': response_time * 1000.0 if response_time is not None else 0.0,
+            # No latency without a response (timeouts, connection errors...), kept out of the percentiles
+            'has_latency': response_time is not None,
+            'body_size': result.get('body_size') or 0,
+            'cached': result.get('cache') in ('hit', 'revalidated'),
+        }
+        if self:
+            vals['run_id'] = self.id
+        return vals
+
+
+class APIWorkflowRunNode(models.Model):
+    _name = 'api.workflow.run.node'
+    _description = 'API Workflow Run Node Result'
+    _order = 'id'
+
+    run_id = fields.Many2one('api.workflow.run', string='Run', required=True, ondelete='cascade', index=True)
+    node_id = fields.Char(string='Node')
+    node_type = fields.Char(string='Node Type')
+    status = fields.Selection([
+        ('success', 'Success'),
+        ('error', 'Error'),
+        ('skipped', 'Skipped'),
+    ], string='Status')
+    message = fields.Char(string='Message')
+    url = fields.Char(string='URL')
+    workflow_id = fields.Many2one(related='run_id.workflow_id', store=True, index=True)
+    endpoint = fields.Char(string='Endpoint', index=True)
+    status_code = fields.Integer(string='Status Code')
+    latency_ms = fields.Float(string='Latency (ms)')
+    has_latency = fields.Boolean(string='Has Latency', default=True,
+                                 help='False for calls that failed before getting a response')
+    body_size = fields.Integer(string='Bytes')
+    cached = fields.Boolean(string='Served From Cache')
+
+
+class APIWorkflowRunStats(models.Model):
+    _name = 'api.workflow.run.stats'
+    _description = 'API Workflow Endpoint Latency Report'
+    _auto = False
+    _order = 'p95_ms desc'
+
+    workflow_id = fields.Many2one('api.workflow', string='Workflow', readonly=True)
+    endpoint = fields.Char(string='Endpoint', readonly=True)
+    call_count = fields.Integer(string='Calls', readonly=True)
+    error_count = fields.Integer(string='Errors', readonly=True)
+    error_rate = fields.Float(string='Error Rate (%)', readonly=True)
+    p50_ms = fields.Float(string='p50 (ms)', readonly=True)
+    p95_ms = fields.Float(string='p95 (ms)', readonly=True)
+    p99_ms = fields.Float(string='p99 (ms)', readonly=True)
+    avg_bytes = fields.Float(string='Avg Bytes', readonly=True)
+    last_call = fields.Datetime(string='Last Call', readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT min(id) AS id,
+                       workflow_id,
+                       endpoint,
+                       count(*) AS call_count,
+                       count(*) FILTER (WHERE status = 'error') AS error_count,
+                       100.0 * count(*) FILTER (WHERE status = 'error') / count(*) AS error_rate,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE has_latency) AS p50_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE has_latency) AS p95_ms,
+                       percentile_cont(0.99) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE has_latency) AS p99_ms,
+                       avg(body_size) AS avg_bytes,
+                       max(create_date) AS last_call
+                  FROM api_workflow_run_node
+                 WHERE status IN ('success', 'error')
+                   AND endpoint IS NOT NULL
+                   AND cached IS NOT TRUE
+                 GROUP BY workflow_id, endpoint
+            )
+        """)
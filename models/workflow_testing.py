@@ -1,13 +1,47 @@
 """ API testing methods for workflow """
-from odoo import models, api
+from odoo import models, api, exceptions, tools
 from requests.auth import HTTPBasicAuth
-from urllib.parse import urlencode, urlparse, parse_qs, urlunparse
+from urllib.parse import urlencode, urlparse, parse_qs, parse_qsl, urlunparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 import json
+import os
+import re
+import tempfile
+import threading
+import time
 import requests
 
+from ..tools import http_pool, instrumentation, benchmark, host_guard, retry, templating, pagination, oauth2, cassette, batch as request_batch
+from ..tools.response_cache import (
+    CacheEntry, response_cache, fingerprint as cache_fingerprint,
+    DEFAULT_MAX_ENTRIES as DEFAULT_CACHE_MAX_ENTRIES, DEFAULT_MAX_BYTES as DEFAULT_CACHE_MAX_BYTES,
+)
+from ..tools.response_body import read_body, DEFAULT_MAX_BODY_BYTES
+from ..tools.workflow_graph import WorkflowGraph
+from ..tools.load_test import run_load
+
 _logger = logging.getLogger(__name__)
 
+# Default limits for concurrent node execution, overridable on the endpoint node
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_CONCURRENCY_PER_HOST = 4
+
+# Node types that issue an HTTP request; every other type only carries config
+API_NODE_TYPES = ('get', 'post', 'put', 'delete', 'paginate')
+# error_type of a request that timed out
+TIMEOUT_ERROR_TYPES = ('Timeout', 'ConnectTimeout', 'ReadTimeout')
+# Largest spooled body kept as an attachment, overridable with api_workflow.spool_max_bytes
+DEFAULT_SPOOL_MAX_BYTES = 16 * 1024 * 1024
+# Config keys an endpoint/auth node passes on to the API nodes it feeds
+AUTH_CONFIG_KEYS = ('authType', 'username', 'password', 'token', 'apiKey', 'keyLocation', 'keyName', 'headerPrefix',
+                    *oauth2.OAUTH2_CONFIG_KEYS)
+# Guard rails for load tests, which run inside a web or cron worker
+MAX_LOAD_CONCURRENCY = 64
+MAX_LOAD_DURATION = 300
+# Share of the worker's real time limit a load test may use, the rest is left for draining and reporting
+LOAD_TIME_LIMIT_SHARE = 0.75
+
 
 class APIWorkflowTesting(models.AbstractModel):
     _name = 'api.workflow.testing'
@@ -17,178 +51,238 @@ class APIWorkflowTesting(models.AbstractModel):
         """
         Helper to join base URL and path cleanly.
         """
-        print('join url', base)
         if not base:
             return path
         if not path:
             return base
         return f"{base.rstrip('/')}/{path.lstrip('/')}"
 
-    def _test_url(self, url, headers=None, auth_type='none', config=None):
+    def _test_url(self, url, headers=None, auth_type='none', config=None, deadline=None):
         """
         Enhanced _test_url method with authentication support
         (Supports Bearer and API Key authentication in header or query)
         """
-        print('_test_url', url)
         config = config or {}
         headers = headers or {}
+        auth = None
+        final_url = url
+        trace = instrumentation.start('GET', url)
         try:
             # 🔐 Add authentication headers if needed
             if auth_type == 'bearer':
                 headers = self._setup_bearer_auth(headers, config)
-                print('🔑 Using Bearer token authentication')
             elif auth_type == 'api-key':
                 headers = self._setup_api_key_auth(headers, config)
-                print('🔑 Using API Key authentication')
             elif auth_type == 'basic':
-                headers = self._setup_basic_auth(config)
+                auth = self._setup_basic_auth(config)
+            elif auth_type == 'oauth2':
+                headers = self._setup_oauth2_auth(headers, config, deadline)
             # 🧩 Handle query parameters for API key (if keyLocation == "query")
-            final_url = url
             if auth_type == 'api-key' and config.get('keyLocation') == 'query':
-                api_key = config.get('apiKey') or 'DEMO_KEY'
-                query_params = config.get('query_params', {})
+                query_params = self._api_key_query_params(config)
                 # Ensure api_key is included
-                query_params.setdefault('api_key', api_key)
-                parsed_url = urlparse(url)
-                existing_params = parse_qs(parsed_url.query)
-                merged_params = {**existing_params, **query_params}
-                query_string = urlencode(merged_params, doseq=True)
-                print('urlunparse',parsed_url.scheme,parsed_url.netloc,parsed_url.path,parsed_url.params, query_string,parsed_url.fragment)
-                final_url = urlunparse((
-                    parsed_url.scheme,
-                    parsed_url.netloc,
-                    parsed_url.path,
-                    parsed_url.params,
-                    query_string,
-                    parsed_url.fragment
-                ))
-                print(f"🔗 Final URL with query params: {final_url}")
-            print(f'🔗 Testing URL: {final_url} with auth: {auth_type}')
+                query_params.setdefault('api_key', config.get('apiKey') or 'DEMO_KEY')
+                final_url = self._add_query_params(url, query_params)
+            # 🗃️ Serve from the response cache when the node opted in
+            cache_ttl = self._get_cache_ttl(config)
+            cache_key = cached = None
+            request_headers = headers
+            if cache_ttl:
+                cache_key = cache_fingerprint(final_url, headers, auth)
+                cached = response_cache.get(cache_key)
+                if cached is not None and cached.fresh:
+                    trace.phase('prepare')
+                    return self._cached_result(cached, 'hit', timings=trace.finish(cache='hit'))
+                if cached is not None:
+                    request_headers = {**headers, **cached.conditional_headers()}
+            trace.phase('prepare')
             # 🧾 Perform GET request
-            if headers:
-                print('📬 Headers:', headers)
-                response = requests.get(final_url, headers=headers, timeout=10, verify=True)
-            else:
-                print('⚠️ No headers provided')
-                response = requests.get(final_url, timeout=10, verify=True)
+            response, attempts = self._send_request('GET', final_url, config, deadline, headers=request_headers or None,
+                                                    auth=auth, verify=True, stream=True)
+            trace.responded()
+            if cached is not None and response.status_code == 304:
+                # Not modified: the stale entry is still valid
+                response.close()
+                cached.refresh(cache_ttl)
+                return self._cached_result(cached, 'revalidated', response.elapsed.total_seconds(),
+                                           timings=trace.finish(304, cache='revalidated'))
+            if not response.ok:
+                response.close()
             response.raise_for_status()
-            # 📦 Parse response
-            try:
-                data = response.json()
-                print('✅ JSON Data received:', data)
-            except ValueError:
-                data = response.text
-                print('ℹ️ Non-JSON response received')
-            _logger.info(f"API GET Response from {final_url}: {data}")
+            # 📦 Read at most maxBodyBytes of the streamed body
+            body = read_body(response, self._get_max_body_bytes(config), bool(config.get('spoolBody')))
+            data = body.data()
+            trace.phase('download')
+            response_headers = dict(response.headers)
+            if cache_ttl and not body.truncated:
+                response_cache.put(cache_key, CacheEntry(
+                    response.status_code, response_headers, data, body.size, cache_ttl))
             return {
                 'status_code': response.status_code,
-                'headers': dict(response.headers),
-                'data': data,
+                'headers': response_headers,
+                'data': body.preview() if body.truncated else data,
                 'response_time': response.elapsed.total_seconds(),
+                'cache': 'miss' if cache_ttl else 'off',
+                'attempts': attempts,
+                'timings': trace.finish(response.status_code, cache='miss' if cache_ttl else None),
+                **self._body_info(body),
             }
         except requests.exceptions.RequestException as e:
-            _logger.error(f"Request failed for {final_url}: {str(e)}")
+            trace.finish(getattr(e.response, 'status_code', None), error=e)
+            _logger.error("Request failed for %s: %s", instrumentation.redact_url(final_url), e)
             raise e
         except Exception as e:
-            _logger.error(f"Unexpected error testing {final_url}: {str(e)}")
+            trace.finish(error=e)
+            _logger.error("Unexpected error testing %s: %s", instrumentation.redact_url(final_url), e)
             raise e
 
+    def _get_cache_ttl(self, config):
+        """Response cache TTL in seconds for a GET node, 0 when caching is off"""
+        if self._get_cassette()[0]:
+            # Every response of a cassette run has to be recorded or replayed
+            return 0
+        try:
+            return max(float(config.get('cacheTtl') or 0), 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def _get_max_body_bytes(self, config):
+        """Largest response body kept in memory for a node"""
+        try:
+            return max(int(config.get('maxBodyBytes') or DEFAULT_MAX_BODY_BYTES), 1)
+        except (TypeError, ValueError):
+            return DEFAULT_MAX_BODY_BYTES
+
+    def _body_info(self, body):
+        """Size, truncation and spool file details of a read body"""
+        return {
+            'body_size': body.size,
+            'truncated': body.truncated,
+            'body_file': body.spool_path,
+        }
+
+    def _store_spooled_bodies(self, results, keep=True):
+        """
+        Move the temp files of spooled bodies into attachments, replacing
+        the server-local path with the download URL; with keep=False the
+        files are only deleted. Attachments keep the first
+        api_workflow.spool_max_bytes of a body, and belong to the run that
+        records the result (see api.workflow.run._link_body_attachments);
+        those no run claims are vacuumed.
+        """
+        max_bytes = self._get_int_param('api_workflow.spool_max_bytes', DEFAULT_SPOOL_MAX_BYTES) if keep else 0
+        for result in results:
+            path = result.pop('body_file', None)
+            if not path:
+                continue
+            try:
+                if keep:
+                    with open(path, 'rb') as file:
+                        raw = file.read(max_bytes)
+                    attachment = self.env['ir.attachment'].create({
+                        'name': f"{result.get('node_id')}_response.body",
+                        'raw': raw,
+                        'res_model': 'api.workflow.run',
+                    })
+                    result['body_attachment_id'] = attachment.id
+                    result['body_url'] = f'/web/content/{attachment.id}?download=true'
+            except OSError as e:
+                # A deduplicated result shares its file with another run, which may have taken it
+                _logger.warning("Spooled body of node %s lost: %s", result.get('node_id'), e)
+            finally:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _cached_result(self, entry, cache_status, response_time=0.0, timings=None):
+        """Build a _test_url result from a cache entry"""
+        return {
+            'status_code': entry.status_code,
+            'headers': entry.headers,
+            'data': entry.data,
+            'response_time': response_time,
+            'cache': cache_status,
+            'timings': timings,
+        }
+
     @api.model
     def test_workflow(self, workflow_data):
         """
         Test workflow with authentication support
         """
-        print('test_workflow', workflow_data)
-        try:
-            nodes = workflow_data.get('nodes', [])
-            connections = workflow_data.get('connections', [])
-            results = []
+        _logger.debug("Testing workflow with %s nodes", len((workflow_data or {}).get('nodes', [])))
+        return self._execute_workflow(workflow_data)
 
-            # 1️⃣ Find endpoint node
-            endpoint_node = next((n for n in nodes if n.get('type') == 'endpoint'), None)
-            base_url = ''
-            if endpoint_node:
-                base_url = endpoint_node.get('config', {}).get('baseUrl', '').rstrip('/')
-
-            # 2️⃣ Find all GET nodes connected directly to the endpoint node
-            endpoint_id = endpoint_node['id'] if endpoint_node else None
-            connected_get_nodes = []
-
-            for conn in connections:
-                if conn['target'] == endpoint_id:
-                    # source is the GET node
-                    source_node = next((n for n in nodes if n['id'] == conn['source']), None)
-                    if source_node and source_node.get('type') == 'get':
-                        connected_get_nodes.append(source_node)
-
-            for node in connected_get_nodes:
-                print('node', node)
-                config = node.get('config', {})
-                path = config.get('url', '')
-                full_url = self._join_url(base_url, path)
-
-                node_type = node.get('type', 'unknown')
-                auth_type = config.get('authType', 'none')
-
-                print('node_type', node_type)
-                print('auth_type', auth_type)
-
-                # Skip non-API nodes
-                if node_type not in ['get', 'post', 'put', 'delete', 'endpoint']:
-                    results.append({
-                        'node_id': node['id'],
-                        'node_type': node_type,
-                        'status': 'skipped',
-                        'message': 'Not an API node',
-                        'url': None
-                    })
-                    continue
-
-                # For GET requests, use _test_url with authentication
-                if node_type == 'get':
-                    try:
-                        # Prepare headers for authentication
-                        headers = {
-                            'Content-Type': 'application/json',
-                            'User-Agent': 'Odoo-API-Workflow/1.0'
-                        }
-
-                        # Add custom headers if any
-                        custom_headers = config.get('headers', [])
-                        for header in custom_headers:
-                            headers[header['key']] = header['value']
+    def _execute_workflow(self, workflow_data, progress_callback=None, graph=None, configure=True, batch=None):
+        """
+        Execute a workflow graph. The connections graph is sorted
+        topologically and executed level by level; API nodes of the same
+        level run in parallel. progress_callback, when given, is called
+        from the calling thread with the results of each finished level.
+        graph may carry an already built WorkflowGraph of workflow_data.
+        configure=False skips reading the pool and cache system parameters,
+        for callers that applied them already and run this off the
+        cursor's thread; spooled bodies are then dropped, not stored.
+        batch, a tools.batch.RequestBatch, shares request limits and
+        deduplicated responses with the other runs of a batch.
+        """
+        if configure:
+            self._configure_http_pool()
+            self._configure_response_cache()
+        connection_stats = http_pool.ConnectionStats()
+        try:
+            plan, endpoint_config = self._plan_workflow(workflow_data, graph)
+            max_workers = self._get_concurrency_limit(
+                endpoint_config, 'maxConcurrency', DEFAULT_MAX_CONCURRENCY)
+            max_per_host = self._get_concurrency_limit(
+                endpoint_config, 'maxConcurrencyPerHost', DEFAULT_MAX_CONCURRENCY_PER_HOST)
+            deadline = self._get_deadline(endpoint_config)
+            scope = self._build_run_scope(plan)
 
-                        response_data = self._test_url(full_url, headers, auth_type, config)
-                        results.append({
-                            'node_id': node['id'],
-                            'node_type': node_type,
-                            'status': 'success',
-                            'message': f'GET request successful - HTTP {response_data.get("status_code", "Unknown")}',
-                            'url': full_url,
-                            'response_data': response_data.get('data'),
-                            'status_code': response_data.get('status_code'),
-                            'response_time': response_data.get('response_time')
-                        })
-                    except Exception as e:
-                        results.append({
+            # Execute each ready level, API nodes of a level in parallel
+            results = []
+            for steps in plan:
+                level_results = [None] * len(steps)
+                api_nodes, api_positions = [], []
+                for position, (node, resolved) in enumerate(steps):
+                    if resolved is not None:
+                        # Fill {{ }} templates from the responses of earlier levels
+                        rendered, error = self._render_api_node(resolved, scope)
+                        if error:
+                            level_results[position] = error
+                            continue
+                        api_nodes.append(rendered)
+                        api_positions.append(position)
+                    else:
+                        level_results[position] = {
                             'node_id': node['id'],
-                            'node_type': node_type,
-                            'status': 'error',
-                            'message': f'GET request failed: {str(e)}',
-                            'url': full_url,
-                            'error': str(e)
-                        })
-                else:
-                    # For other HTTP methods, use _make_api_call_with_auth
-                    result = self._make_api_call_with_auth(full_url, node_type, config, auth_type)
-                    result['node_id'] = node['id']
-                    result['node_type'] = node_type
-                    results.append(result)
+                            'node_type': node.get('type', 'unknown'),
+                            'status': 'skipped',
+                            'message': 'Not an API node',
+                            'url': None
+                        }
+                api_results = self._run_api_nodes(api_nodes, max_workers, max_per_host, deadline, batch,
+                                                  connection_stats)
+                for position, node, result in zip(api_positions, api_nodes, api_results):
+                    level_results[position] = result
+                    scope.capture(node['id'], result, templating.compile_extract(node['config']))
+                self._store_spooled_bodies(api_results, keep=configure)
+                results.extend(level_results)
+                if progress_callback:
+                    progress_callback(level_results)
 
+            message = f'Tested {len([r for r in results if r["status"] != "skipped"])} API nodes'
+            cancelled = len([r for r in results if r.get('error_type') == 'DeadlineExceeded'])
+            if cancelled:
+                message += f', {cancelled} cancelled by the workflow deadline'
             return {
                 'success': True,
-                'message': f'Tested {len([r for r in results if r["status"] != "skipped"])} API nodes',
-                'results': results
+                'message': message,
+                'deadline_exceeded': bool(cancelled),
+                'results': results,
+                'connection_stats': connection_stats.as_dict(),
+                'circuit_breakers': host_guard.states(),
             }
 
         except Exception as e:
@@ -199,11 +293,686 @@ class APIWorkflowTesting(models.AbstractModel):
                 'results': []
             }
 
-    def _make_api_call_with_auth(self, url, method, config, auth_type):
+    def _get_int_param(self, key, default, maximum=None):
+        """Positive integer system parameter, default when unset or invalid"""
+        try:
+            value = max(int(self.env['ir.config_parameter'].sudo().get_param(key, default)), 1)
+        except (TypeError, ValueError):
+            value = default
+        return min(value, maximum) if maximum else value
+
+    def _run_workflows_parallel(self, jobs, parallelism, on_result, batch=None):
+        """
+        Run compiled workflows, jobs being {key: CompiledWorkflow}, at
+        most parallelism at a time. Only the runs happen on the worker
+        threads, so the HTTP pool must be configured beforehand;
+        on_result(key, compiled, result, duration) is called on the
+        calling thread and cursor as each run finishes.
+        """
+        if not jobs:
+            return
+        testing = self.env['api.workflow.testing']
+
+        def run(compiled):
+            started = time.perf_counter()
+            result = testing._execute_workflow(compiled.data, graph=compiled.graph, configure=False, batch=batch)
+            return result, time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=min(parallelism, len(jobs)),
+                                thread_name_prefix='api_workflow_runs') as executor:
+            futures = {executor.submit(run, compiled): key for key, compiled in jobs.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                result, duration = future.result()
+                on_result(key, jobs[key], result, duration)
+
+    @api.model
+    def load_test_workflow(self, workflow_data, concurrency=4, target_rps=10, duration=30, iterations=0):
+        """
+        Replay the workflow's API nodes repeatedly from `concurrency`
+        virtual users at a combined target_rps (0 = as fast as possible)
+        for `duration` seconds or `iterations` workflow iterations.
+        Requests go through _execute_api_node, so auth and headers are
+        handled exactly as in test_workflow; the response cache is bypassed.
+        The duration is capped to fit within the worker's time limit.
+        """
+        concurrency = min(max(int(concurrency or 1), 1), MAX_LOAD_CONCURRENCY)
+        duration = min(max(float(duration or 1), 1.0), MAX_LOAD_DURATION)
+        time_limit = self._get_time_limit()
+        if time_limit:
+            duration = min(duration, max(time_limit * LOAD_TIME_LIMIT_SHARE, 1.0))
+        target_rps = max(float(target_rps or 0), 0.0)
+        self._configure_http_pool(min_pool_size=concurrency)
+        try:
+            plan, _endpoint_config = self._plan_workflow(workflow_data)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+        sequence = [resolved for steps in plan for _node, resolved in steps if resolved is not None]
+        for node in sequence:
+            node['config'].update(cacheTtl=0, spoolBody=False)
+        # Every virtual user runs the sequence in order on its own thread, templates
+        # read the responses of that user's current iteration
+        users = threading.local()
+
+        def execute(node):
+            if node is sequence[0]:
+                users.scope = self._build_run_scope(plan)
+            rendered, error = self._render_api_node(node, users.scope)
+            if error:
+                return error
+            result = self._execute_api_node(rendered)
+            users.scope.capture(node['id'], result, templating.compile_extract(node['config']))
+            return result
+
+        report = run_load(sequence, execute, concurrency, target_rps, duration, int(iterations or 0))
+        report.update({'success': True, 'nodes': len(sequence), 'concurrency': concurrency})
+        _logger.info("Load test finished: %s requests in %ss (%s rps), %s failures",
+                     report['requests'], report['duration'], report['throughput_rps'], report['failures'])
+        return report
+
+    def _get_time_limit(self):
+        """
+        Real time limit (s) of the worker running this call, None when
+        unlimited: limit_time_real_cron for background runs (see
+        api.workflow.run), limit_time_real for requests. Threaded servers
+        (workers = 0) enforce none.
+        """
+        if not tools.config.get('workers'):
+            return None
+        limit = -1
+        if self.env.context.get('api_workflow_background'):
+            limit = tools.config.get('limit_time_real_cron', -1)
+        if limit is None or limit < 0:
+            limit = tools.config.get('limit_time_real')
+        return limit if limit and limit > 0 else None
+
+    @api.model
+    def run_benchmark(self, sizes=benchmark.DEFAULT_SIZES, shape='layered', latency_ms=5, payload_bytes=1024,
+                      error_rate=0.0, memory=True, baseline=None, backend='mock'):
+        """
+        Run synthetic workflows of the given node counts through
+        _execute_workflow against a local mock API and report wall time,
+        requests/sec, per-request overhead and peak memory per size.
+        A previous report passed as baseline adds the regressions found.
+        The 'cassette' backend records each workflow against the mock API
+        once, then times network-free replays: the engine alone.
+        Meant for `odoo-bin shell`:
+            print(env['api.workflow.testing'].run_benchmark()['table'])
+        """
+        if backend not in benchmark.BACKENDS:
+            raise exceptions.UserError(f"Unknown benchmark backend {backend}, expected one of {benchmark.BACKENDS}")
+        self._configure_http_pool()
+        # The engine clamps requests to one host by both limits, the bare baseline must too
+        parallelism = min(
+            self._get_concurrency_limit({}, 'maxConcurrency', DEFAULT_MAX_CONCURRENCY),
+            self._get_concurrency_limit({}, 'maxConcurrencyPerHost', DEFAULT_MAX_CONCURRENCY_PER_HOST),
+        )
+        with benchmark.MockAPIServer(latency_ms, payload_bytes, error_rate) as server:
+            # Warm up the pools so the first case does not pay for connection setup alone
+            self._execute_workflow(benchmark.synthetic_workflow(server.url, 10, shape))
+            if backend == 'cassette':
+                cases = [self._benchmark_replay(server, size, shape, memory) for size in sizes]
+            else:
+                cases = [
+                    benchmark.run_case(self._execute_workflow, server, size, shape,
+                                       parallelism=parallelism, memory=memory)
+                    for size in sizes
+                ]
+        report = {
+            'backend': backend,
+            'server': {'latency_ms': latency_ms, 'payload_bytes': payload_bytes, 'error_rate': error_rate},
+            'parallelism': parallelism,
+            'cases': cases,
+        }
+        report['table'] = benchmark.format_report(report)
+        if baseline:
+            report['regressions'] = benchmark.compare(report, baseline)
+        _logger.info("Workflow benchmark (%s):\n%s", shape, report['table'])
+        return report
+
+    def _benchmark_replay(self, server, size, shape, memory):
+        """Benchmark case replaying a cassette recorded from the mock API"""
+        with tempfile.TemporaryDirectory(prefix='api_workflow_benchmark_') as directory:
+            path = os.path.join(directory, f'{shape}_{size}.cassette')
+            self._execute_with_cassette(benchmark.synthetic_workflow(server.url, size, shape), path, 'record')
+
+            def replay(workflow_data):
+                return self._execute_with_cassette(workflow_data, path, 'replay')
+
+            try:
+                return benchmark.run_case(replay, server, size, shape, memory=memory, replay=True)
+            finally:
+                cassette.close_cassette(path)
+
+    def _plan_workflow(self, workflow_data, graph=None):
+        """
+        Resolve a workflow into execution levels without running anything.
+        Returns (plan, endpoint_config): plan is a list of levels, each a
+        list of (node, resolved_api_node) pairs where resolved_api_node is
+        None for non-API nodes; endpoint_config holds the workflow settings.
+        """
+        # 1️⃣ Index nodes and connections once, reject cycles up front
+        graph = graph or WorkflowGraph(workflow_data)
+        levels = graph.levels()
+
+        # 2️⃣ Workflow wide settings come from the first endpoint node
+        endpoint_node = graph.first_of_type('endpoint')
+        endpoint_config = endpoint_node.get('config', {}) if endpoint_node else {}
+        default_base_url = (endpoint_config.get('baseUrl') or '').rstrip('/')
+        default_limits = self._node_contribution(endpoint_node).get('limits', {}) if endpoint_node else {}
+
+        # 3️⃣ Propagate config node context downstream, level by level
+        contexts = {}
+        plan = []
+        for level in levels:
+            steps = []
+            for node_id in level:
+                node = graph.nodes[node_id]
+                context = self._build_node_context(graph, node_id, contexts)
+                contexts[node_id] = context
+                resolved = None
+                if node.get('type') in API_NODE_TYPES:
+                    resolved = self._resolve_api_node(graph, node, context, default_base_url, default_limits)
+                steps.append((node, resolved))
+            plan.append(steps)
+        return plan, endpoint_config
+
+    def _build_run_scope(self, plan):
+        """Template scope of a run, keeping only the response parts its templates use"""
+        configs = [resolved['config'] for steps in plan for _node, resolved in steps if resolved is not None]
+        return templating.RunScope(templating.wanted_paths(configs))
+
+    def _render_api_node(self, node, scope):
+        """
+        Return (node, None) with the node's url, params, headers and body
+        templates rendered from scope, or (None, error result) when a
+        template cannot be resolved or an extract path is invalid, so
+        the node fails before its request is sent.
+        """
+        try:
+            templating.compile_extract(node['config'])
+            config = templating.render_config(node['config'], scope.resolve)
+        except templating.TemplateError as e:
+            return None, {
+                'node_id': node['id'],
+                'node_type': node.get('type', 'unknown'),
+                'status': 'error',
+                'message': f'Template error: {e}',
+                'url': node['config'].get('url'),
+                'error': str(e),
+                'error_type': 'TemplateError',
+            }
+        return (node if config is node['config'] else {**node, 'config': config}), None
+
+    def _node_contribution(self, node):
+        """
+        Context a configuration node (endpoint, auth, params, headers, body)
+        hands to the nodes it is connected to
+        """
+        node_type = node.get('type')
+        config = node.get('config') or {}
+        contribution = {}
+        if node_type == 'endpoint' and config.get('baseUrl'):
+            contribution['baseUrl'] = config['baseUrl'].rstrip('/')
+        if node_type == 'endpoint' and any(config.get(key) for key in host_guard.HOST_LIMIT_KEYS):
+            contribution['limits'] = {key: config[key] for key in host_guard.HOST_LIMIT_KEYS if config.get(key)}
+        if node_type in ('endpoint', 'auth') and config.get('authType', 'none') != 'none':
+            contribution['auth'] = {key: config[key] for key in AUTH_CONFIG_KEYS if key in config}
+        if node_type in ('params', 'headers'):
+            items = config.get(node_type) or []
+            contribution[node_type] = {item['key']: item['value'] for item in items if item.get('key')}
+        if node_type == 'body' and config.get('body'):
+            contribution['body'] = config['body']
+        return contribution
+
+    def _merge_context(self, base, extra):
+        """Merge two node contexts, extra wins; inputs are never mutated"""
+        if not extra:
+            return base
+        if not base:
+            return extra
+        merged = dict(base)
+        for key, value in extra.items():
+            if key in ('params', 'headers'):
+                merged[key] = {**base.get(key, {}), **value}
+            else:
+                merged[key] = value
+        return merged
+
+    def _build_node_context(self, graph, node_id, contexts):
+        """
+        Context flowing out of a node: everything its predecessors provide
+        plus the node's own contribution. API nodes only forward the
+        endpoint level context (base URL, auth and host limits), request
+        specific params, headers and body stop at the request they were
+        wired to.
+        """
+        context = {}
+        for source_id in graph.predecessors[node_id]:
+            source_context = contexts[source_id]
+            if graph.nodes[source_id].get('type') in API_NODE_TYPES:
+                source_context = {key: value for key, value in source_context.items()
+                                  if key in ('baseUrl', 'auth', 'limits')}
+            context = self._merge_context(context, source_context)
+        return self._merge_context(context, self._node_contribution(graph.nodes[node_id]))
+
+    def _resolve_api_node(self, graph, node, context, default_base_url, default_limits=None):
+        """
+        Return a copy of an API node whose config has the inherited context
+        applied. Configuration nodes wired directly downstream of the API node
+        (e.g. GET -> endpoint) also apply to it.
+        """
+        for target_id in graph.successors[node['id']]:
+            target = graph.nodes[target_id]
+            if target.get('type') not in API_NODE_TYPES:
+                context = self._merge_context(context, self._node_contribution(target))
+
+        node_config = node.get('config') or {}
+        auth = context.get('auth', {})
+        limits = context.get('limits') or default_limits or {}
+        config = {**limits, **auth, **node_config}
+        if node_config.get('authType', 'none') == 'none' and auth:
+            config['authType'] = auth['authType']
+        config['baseUrl'] = context.get('baseUrl') or default_base_url
+        for key in ('params', 'headers'):
+            own = {item['key']: item['value'] for item in node_config.get(key) or [] if item.get('key')}
+            merged = {**context.get(key, {}), **own}
+            config[key] = [{'key': k, 'value': v} for k, v in merged.items()]
+        if not config.get('body') and context.get('body'):
+            config['body'] = context['body']
+        return {**node, 'config': config}
+
+    def _send_request(self, method, url, config, deadline=None, **kwargs):
+        """
+        Send a request with the node's timeout (milliseconds) and retry
+        policy (see tools.retry.RetryPolicy), never past deadline.
+        Returns (response, attempts); the response of the last attempt is
+        returned even when its status asked for another retry.
+        """
+        policy = retry.RetryPolicy.from_config(config)
+        attempt = 0
+        while True:
+            attempt += 1
+            kwargs['timeout'] = retry.timeout_seconds(config, deadline)
+            try:
+                response = self._guarded_request(method, url, config, deadline, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= policy.attempts:
+                    raise
+                delay = policy.delay(attempt)
+                response = None
+            else:
+                if response.status_code == 401 and config.get('authType') == 'oauth2':
+                    # Revoked or expired early: the next request fetches a new token
+                    oauth2.invalidate(config, (kwargs.get('headers') or {}).get('Authorization'))
+                if attempt >= policy.attempts or response.status_code not in policy.statuses:
+                    return response, attempt
+                delay = policy.delay(attempt, retry.parse_retry_after(response.headers.get('Retry-After')))
+            if delay is None or (deadline is not None and time.monotonic() + delay >= deadline):
+                # No time for another attempt: hand back what we have
+                if response is None:
+                    raise retry.DeadlineExceeded("Workflow deadline exceeded while retrying")
+                return response, attempt
+            if response is not None:
+                response.close()
+            _logger.debug("Retrying %s %s in %.2fs (attempt %s of %s)",
+                          method, instrumentation.redact_url(url), delay, attempt + 1, policy.attempts)
+            time.sleep(delay)
+
+    def _get_deadline(self, config):
+        """time.monotonic() by which the whole workflow must be done, from workflowDeadline (s)"""
+        try:
+            seconds = float(config.get('workflowDeadline') or 0)
+        except (TypeError, ValueError):
+            seconds = 0
+        return time.monotonic() + seconds if seconds > 0 else None
+
+    def _guarded_request(self, method, url, config, deadline=None, **kwargs):
+        """
+        http_pool.request behind the host's rate limit and circuit breaker
+        (configured on the endpoint node). Raises CircuitOpenError without
+        sending anything while the host's breaker is open, DeadlineExceeded
+        when the rate limit would hold the request past deadline. Cassette
+        runs record every response, or replay them without network access.
+        """
+        mode, path = self._get_cassette()
+        if mode == 'replay':
+            return cassette.replay(path).response(method, url, cassette.request_body(kwargs))
+        guard = host_guard.get_guard(url, config)
+        if guard is None:
+            response = http_pool.request(method, url, **kwargs)
+        else:
+            guard.before_request(deadline)
+            try:
+                if deadline is not None:
+                    # Waiting for the rate limit used up part of the time left
+                    kwargs['timeout'] = retry.timeout_seconds(config, deadline)
+                response = http_pool.request(method, url, **kwargs)
+            except retry.DeadlineExceeded:
+                # Nothing was sent, not a failure of the host
+                guard.release()
+                raise
+            except BaseException as e:
+                guard.record(error=e)
+                raise
+            guard.record(response.status_code)
+        if mode == 'record':
+            # Read the body now, within the node's maxBodyBytes (one byte more, so the caller
+            # still sees a longer body as truncated); the caller then reads it from memory
+            body = read_body(response, self._get_max_body_bytes(config) + 1)
+            response._content, response._content_consumed = body.content, True
+            cassette.recorder(path).add(cassette.fingerprint(method, url, cassette.request_body(kwargs)),
+                                        response.status_code, response.reason, response.headers, body.content)
+        return response
+
+    def _get_cassette(self):
+        """
+        (mode, key) of the cassette run: the cassette's path when recording,
+        the replay token when replaying; (None, None) outside cassette runs
+        """
+        context = self.env.context
+        return context.get('api_workflow_cassette_mode'), context.get('api_workflow_cassette')
+
+    def _cassette_path(self, name):
+        """Path of a named cassette, kept in the database's filestore"""
+        name = re.sub(r'[^\w.-]', '_', name or '').strip('._')
+        if not name:
+            raise exceptions.UserError("A cassette needs a name")
+        return os.path.join(tools.config.filestore(self.env.cr.dbname), 'api_workflow_cassettes', f'{name}.cassette')
+
+    @api.model
+    def record_workflow(self, workflow_data, cassette_name):
+        """
+        Run the workflow against the live APIs, recording every response
+        into the named cassette for later network-free replays. Bodies are
+        recorded up to each node's maxBodyBytes, like they are read.
+        """
+        return self._execute_with_cassette(workflow_data, self._cassette_path(cassette_name), 'record')
+
+    @api.model
+    def replay_workflow(self, workflow_data, cassette_name):
+        """Run the workflow with every response served from the named cassette"""
+        return self._execute_with_cassette(workflow_data, self._cassette_path(cassette_name), 'replay')
+
+    def _execute_with_cassette(self, workflow_data, path, mode, graph=None):
+        """
+        _execute_workflow recording to or replaying from the cassette at
+        path. A recording replaces the cassette only once the run is over;
+        a replay serves repeated requests their recorded responses in turn.
+        """
+        try:
+            if mode == 'record':
+                cassette.start_recording(path)
+                key = path
+            else:
+                key = cassette.start_replay(path)
+        except (cassette.CassetteError, OSError) as e:
+            raise exceptions.UserError(f"Cassette unavailable: {e}")
+        runner = self.with_context(api_workflow_cassette=key, api_workflow_cassette_mode=mode)
+        try:
+            result = runner._execute_workflow(workflow_data, graph=graph)
+        except BaseException:
+            if mode == 'record':
+                cassette.stop_recording(path, keep=False)
+            raise
+        finally:
+            if mode == 'replay':
+                cassette.stop_replay(key)
+        if mode == 'record':
+            result['cassette'] = cassette.stop_recording(path)
+        return result
+
+    def _configure_http_pool(self, min_pool_size=0):
+        """Apply the HTTP pool and instrumentation system parameters to the shared pools"""
+        params = self.env['ir.config_parameter'].sudo()
+        instrumentation.configure(metrics=params.get_param('api_workflow.metrics', False))
+        pool_size = int(params.get_param('api_workflow.http_pool_size', http_pool.DEFAULT_POOL_SIZE))
+        http_pool.configure(
+            pool_size=max(pool_size, min_pool_size),
+            keepalive=params.get_param('api_workflow.http_keepalive', http_pool.DEFAULT_KEEPALIVE),
+            max_retries=params.get_param('api_workflow.http_max_retries', http_pool.DEFAULT_MAX_RETRIES),
+        )
+
+    def _configure_response_cache(self):
+        """Apply the response cache size limits from system parameters"""
+        params = self.env['ir.config_parameter'].sudo()
+        response_cache.configure(
+            max_entries=params.get_param('api_workflow.cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES),
+            max_bytes=params.get_param('api_workflow.cache_max_bytes', DEFAULT_CACHE_MAX_BYTES),
+        )
+
+    def _get_concurrency_limit(self, config, key, default):
+        """Read a positive integer concurrency limit from a node config"""
+        try:
+            value = int(config.get(key) or default)
+        except (TypeError, ValueError):
+            value = default
+        return max(value, 1)
+
+    def _run_api_nodes(self, nodes, max_workers, max_per_host, deadline=None, batch=None, connection_stats=None):
+        """
+        Execute API nodes, concurrently when allowed, capping in-flight
+        requests per workflow (max_workers) and per target host (max_per_host).
+        Nodes that have not started when deadline (time.monotonic()) passes
+        are cancelled. Results are returned in the same order as the given nodes.
+        The requests the nodes send are counted into connection_stats.
+        """
+        def execute(node):
+            with http_pool.counting(connection_stats):
+                if batch is not None:
+                    return self._execute_batched_api_node(node, deadline, batch)
+                return self._execute_api_node(node, deadline)
+
+        if max_workers <= 1 or len(nodes) <= 1:
+            return [execute(node) for node in nodes]
+
+        host_slots = {}
+        host_slots_lock = threading.Lock()
+
+        def run(node):
+            full_url = self._node_url(node.get('config', {}))
+            host = urlparse(full_url).netloc
+            with host_slots_lock:
+                slot = host_slots.setdefault(host, threading.BoundedSemaphore(max_per_host))
+            with slot:
+                try:
+                    return execute(node)
+                except Exception as e:
+                    return {
+                        'node_id': node.get('id'),
+                        'node_type': node.get('type', 'unknown'),
+                        'status': 'error',
+                        'message': f'Unexpected error: {str(e)}',
+                        'url': full_url,
+                        'error': str(e),
+                        'error_type': type(e).__name__,
+                    }
+
+        workers = min(max_workers, len(nodes))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api_workflow') as executor:
+            # map() yields in submission order, so results keep the node order
+            return list(executor.map(run, nodes))
+
+    def _execute_batched_api_node(self, node, deadline, batch):
+        """
+        Execute an API node within the limits of a batch. Identical GET and
+        paginate nodes of every workflow in the batch share one request.
+        """
+        if deadline is not None and time.monotonic() >= deadline:
+            # Cancelled, and not a result to hand to the other workflows
+            return self._execute_api_node(node, deadline)
+        host = urlparse(self._node_url(node.get('config', {}))).netloc
+
+        def send():
+            return batch.send(host, lambda: self._execute_api_node(node, deadline))
+
+        if node.get('type') not in request_batch.DEDUPLICABLE_NODE_TYPES:
+            return send()
+        def shareable(result):
+            # Cut short by this workflow's deadline, cancelled or timed out with the timeout
+            # clamped to it: the other workflows send the request again
+            error_type = result.get('error_type')
+            if error_type == 'DeadlineExceeded':
+                return False
+            return deadline is None or error_type not in TIMEOUT_ERROR_TYPES
+
+        try:
+            result, shared = batch.run(self._request_key(node), send, shareable, deadline)
+        except retry.DeadlineExceeded:
+            # Gave up waiting for another workflow's request: cancelled like any node past the deadline
+            return self._execute_api_node(node, deadline)
+        if shared or 'node_id' not in result:
+            result = {**result, 'node_id': node['id'], 'node_type': node.get('type'), 'deduplicated': shared}
+        return result
+
+    def _request_key(self, node):
+        """Key of the request a resolved API node sends: same key, same request"""
+        config = {key: value for key, value in node.get('config', {}).items() if key != 'extract'}
+        return json.dumps([node.get('type'), config], sort_keys=True, default=str)
+
+    def _node_url(self, config):
+        """Full request URL of a resolved API node, query params included"""
+        full_url = self._join_url(config.get('baseUrl', ''), config.get('url', ''))
+        params = [(item['key'], item['value']) for item in config.get('params') or []]
+        if params:
+            parsed_url = urlparse(full_url)
+            query_string = urlencode(parse_qsl(parsed_url.query) + params)
+            full_url = urlunparse(parsed_url._replace(query=query_string))
+        return full_url
+
+    def _execute_api_node(self, node, deadline=None):
+        """
+        Execute a single resolved API node and return its result dict
+        """
+        config = node.get('config', {})
+        full_url = self._node_url(config)
+
+        node_type = node.get('type', 'unknown')
+        auth_type = config.get('authType', 'none')
+
+        if deadline is not None and time.monotonic() >= deadline:
+            return {
+                'node_id': node['id'],
+                'node_type': node_type,
+                'status': 'error',
+                'message': 'Cancelled: workflow deadline exceeded',
+                'url': full_url,
+                'error': 'Workflow deadline exceeded',
+                'error_type': 'DeadlineExceeded',
+            }
+
+        # Skip non-API nodes
+        if node_type not in ['get', 'post', 'put', 'delete', 'paginate', 'endpoint']:
+            return {
+                'node_id': node['id'],
+                'node_type': node_type,
+                'status': 'skipped',
+                'message': 'Not an API node',
+                'url': None
+            }
+
+        if node_type == 'paginate':
+            return self._execute_paginate_node(node, full_url, config, auth_type, deadline)
+
+        # For GET requests, use _test_url with authentication
+        if node_type == 'get':
+            try:
+                headers = self._get_request_headers(config)
+                response_data = self._test_url(full_url, headers, auth_type, config, deadline)
+                return {
+                    'node_id': node['id'],
+                    'node_type': node_type,
+                    'status': 'success',
+                    'message': f'GET request successful - HTTP {response_data.get("status_code", "Unknown")}',
+                    'url': full_url,
+                    'response_data': response_data.get('data'),
+                    'status_code': response_data.get('status_code'),
+                    'headers': response_data.get('headers'),
+                    'response_time': response_data.get('response_time'),
+                    'cache': response_data.get('cache'),
+                    'attempts': response_data.get('attempts'),
+                    'body_size': response_data.get('body_size'),
+                    'truncated': response_data.get('truncated', False),
+                    'body_file': response_data.get('body_file'),
+                    'timings': response_data.get('timings'),
+                }
+            except Exception as e:
+                return {
+                    'node_id': node['id'],
+                    'node_type': node_type,
+                    'status': 'error',
+                    'message': f'GET request failed: {str(e)}',
+                    'url': full_url,
+                    'error': str(e),
+                    'error_type': type(e).__name__,
+                }
+        else:
+            # For other HTTP methods, use _make_api_call_with_auth
+            result = self._make_api_call_with_auth(full_url, node_type, config, auth_type, deadline)
+            result['node_id'] = node['id']
+            result['node_type'] = node_type
+            return result
+
+    def _get_request_headers(self, config):
+        """Default headers of a GET node plus its custom headers"""
+        headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'Odoo-API-Workflow/1.0'
+        }
+        for header in config.get('headers', []):
+            headers[header['key']] = header['value']
+        return headers
+
+    def _execute_paginate_node(self, node, full_url, config, auth_type, deadline=None):
+        """
+        Follow the pages of a paginate node one GET at a time. Pages are
+        summarised as they come (counts, bytes, latency per page) rather
+        than kept, with the next one prefetched when the node asks for it.
+        """
+        headers = self._get_request_headers(config)
+        # Every page is a fresh request, the response cache (or a spool file) would only hold bodies we drop
+        page_config = {**config, 'cacheTtl': 0, 'spoolBody': False}
+
+        def fetch(url):
+            response_data = self._test_url(url, dict(headers), auth_type, page_config, deadline)
+            return (response_data.get('status_code'), response_data.get('headers'), response_data.get('data'),
+                    response_data.get('body_size'), response_data.get('response_time'))
+
+        try:
+            paginator = pagination.Paginator(config)
+            pages = paginator.pages(full_url, fetch)
+            if config.get('prefetch'):
+                pages = pagination.prefetched(pages)
+            summary = pagination.summarize(pages)
+        except Exception as e:
+            return {
+                'node_id': node['id'],
+                'node_type': 'paginate',
+                'status': 'error',
+                'message': f'Pagination failed: {str(e)}',
+                'url': full_url,
+                'error': str(e),
+                'error_type': type(e).__name__,
+            }
+        summary['stopped'] = paginator.stopped
+        return {
+            'node_id': node['id'],
+            'node_type': 'paginate',
+            'status': 'success',
+            'message': f"Fetched {summary['pages']} pages, {summary['items']} items ({paginator.stopped})",
+            'url': full_url,
+            'response_data': summary,
+            'status_code': summary['last_status_code'],
+            'response_time': summary['latency_ms']['total'] / 1000.0,
+            'body_size': summary['bytes'],
+        }
+
+    def _make_api_call_with_auth(self, url, method, config, auth_type, deadline=None):
         """
         Make API call with authentication support
         """
-        print('_make_api_call_with_auth', url)
+        http_method = method.upper() if method != 'endpoint' else 'GET'
+        trace = instrumentation.start(http_method, url)
         try:
             # Prepare headers
             headers = {
@@ -217,7 +986,6 @@ class APIWorkflowTesting(models.AbstractModel):
                 headers[header['key']] = header['value']
 
             # Prepare request parameters
-            timeout = config.get('timeout', 10)
             verify_ssl = config.get('verify_ssl', True)
 
             # Prepare authentication
@@ -228,70 +996,68 @@ class APIWorkflowTesting(models.AbstractModel):
                 headers = self._setup_bearer_auth(headers, config)
             elif auth_type == 'api-key':
                 headers = self._setup_api_key_auth(headers, config)
+            elif auth_type == 'oauth2':
+                headers = self._setup_oauth2_auth(headers, config, deadline)
 
             final_url = url
             if auth_type == 'api-key' and config.get('keyLocation') == 'query':
-                query_params = config.get('query_params', {})
+                query_params = self._api_key_query_params(config)
                 if query_params:
-                    from urllib.parse import urlencode, urlparse, parse_qs
-                    # Parse existing URL and add query parameters
-                    parsed_url = urlparse(url)
-                    existing_params = parse_qs(parsed_url.query)
-                    # Merge existing params with new params
-                    merged_params = {**existing_params, **query_params}
-                    # Rebuild URL with all parameters
-                    query_string = urlencode(merged_params, doseq=True)
-                    final_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
-                    if query_string:
-                        final_url += f"?{query_string}"
-                    print(f"🔗 Final URL with query params: {final_url}")
+                    final_url = self._add_query_params(url, query_params)
 
             # Prepare request data
             data = None
             if method in ['post', 'put']:
                 data = self._prepare_request_data(config)
 
-            # Determine HTTP method
-            http_method = method.upper() if method != 'endpoint' else 'GET'
-
-            _logger.info(f"Making {http_method} request to: {url} with auth: {auth_type}")
+            trace.phase('prepare')
 
             # Make the request
-            response = requests.request(
-                method=http_method,
-                url=url,
+            response, attempts = self._send_request(
+                http_method,
+                final_url,
+                config,
+                deadline,
                 headers=headers,
                 json=data,
                 auth=auth,
-                timeout=timeout,
-                verify=verify_ssl
+                verify=verify_ssl,
+                stream=True
             )
+            trace.responded()
 
             # Process response
-            return self._process_response(response, url, http_method)
+            result = self._process_response(response, url, http_method, config)
+            result['attempts'] = attempts
+            trace.phase('download')
+            result['timings'] = trace.finish(response.status_code)
+            return result
 
         except requests.exceptions.RequestException as e:
+            trace.finish(getattr(e.response, 'status_code', None), error=e)
             return {
                 'status': 'error',
                 'message': f'Request failed: {str(e)}',
                 'url': url,
                 'method': method,
                 'error': str(e),
+                'error_type': type(e).__name__,
                 'status_code': None
             }
         except Exception as e:
+            trace.finish(error=e)
             return {
                 'status': 'error',
                 'message': f'Unexpected error: {str(e)}',
                 'url': url,
                 'method': method,
                 'error': str(e),
+                'error_type': type(e).__name__,
                 'status_code': None
             }
 
     def _setup_basic_auth(self, config):
         """Setup Basic Authentication"""
-        print('_setup_basic_auth', config)
         username = config.get('username', '')
         password = config.get('password', '')
         if username and password:
@@ -300,7 +1066,6 @@ class APIWorkflowTesting(models.AbstractModel):
 
     def _setup_bearer_auth(self, headers, config):
         """Setup Bearer Token Authentication"""
-        print('_setup_bearer_auth', headers, config)
         token = config.get('token', '')
         if token:
             headers['Authorization'] = f'Bearer {token}'
@@ -308,7 +1073,6 @@ class APIWorkflowTesting(models.AbstractModel):
 
     def _setup_api_key_auth(self, headers, config):
         """Setup API Key Authentication"""
-        print('_setup_api_key_auth', headers, config)
         api_key = config.get('apiKey', '')
         key_location = config.get('keyLocation', 'header')
         key_name = config.get('keyName', 'X-API-Key')
@@ -317,33 +1081,58 @@ class APIWorkflowTesting(models.AbstractModel):
             if key_location == 'header':
                 full_value = f"{header_prefix} {api_key}".strip() if header_prefix else api_key
                 headers[key_name] = full_value
-            elif key_location == 'query':
-                # For query parameters, we'll handle this in the URL building
-                # Store the parameter for later use
-                if 'query_params' not in config:
-                    config['query_params'] = {}
-                config['query_params'][key_name] = api_key
         return headers
 
+    def _api_key_query_params(self, config):
+        """
+        Query parameters carrying the API key when keyLocation is "query".
+        A new dict every call: the node config is shared between threads
+        and runs, and is never written to.
+        """
+        api_key = config.get('apiKey', '')
+        if api_key and config.get('keyLocation', 'header') == 'query':
+            return {config.get('keyName', 'X-API-Key'): api_key}
+        return {}
+
+    def _add_query_params(self, url, query_params):
+        """url with query_params merged into its query string"""
+        parsed_url = urlparse(url)
+        merged_params = {**parse_qs(parsed_url.query), **query_params}
+        return urlunparse(parsed_url._replace(query=urlencode(merged_params, doseq=True)))
+
+    def _setup_oauth2_auth(self, headers, config, deadline=None):
+        """
+        Setup OAuth2 client-credentials authentication: a token from the
+        shared cache, fetched from tokenUrl once per client and scope.
+        """
+        timeout = retry.timeout_seconds(config, deadline)
+
+        def send(method, url, **kwargs):
+            # No host limits for the token endpoint, but cassette runs record and replay it too
+            return self._guarded_request(method, url, {}, **kwargs)
+
+        token = oauth2.get_token(config, timeout, send)
+        return {**headers, 'Authorization': token.header}
+
     def _prepare_request_data(self, config):
         """Prepare request data for POST/PUT requests"""
-        print('_prepare_request_data', config)
         body_content = config.get('body')
+        if body_content and not isinstance(body_content, str):
+            # A rendered body template is already data
+            return body_content
         if body_content:
             try:
                 return json.loads(body_content)
             except json.JSONDecodeError:
-                _logger.warning(f"Invalid JSON in request body: {body_content}")
+                _logger.warning("Invalid JSON in request body (%s chars), sending it as text", len(body_content))
                 return body_content
         return None
 
-    def _process_response(self, response, url, method):
-        """Process the API response"""
-        print('_process_response', response, url, method)
-        try:
-            response_data = response.json()
-        except ValueError:
-            response_data = response.text
+    def _process_response(self, response, url, method, config=None):
+        """Process the API response, reading at most maxBodyBytes of the body"""
+        config = config or {}
+        body = read_body(response, self._get_max_body_bytes(config), bool(config.get('spoolBody')))
+        response_data = body.preview() if body.truncated else body.data()
 
         # Determine status based on HTTP status code
         if response.status_code < 400:
@@ -361,5 +1150,6 @@ class APIWorkflowTesting(models.AbstractModel):
             'status_code': response.status_code,
             'response_data': response_data,
             'response_time': response.elapsed.total_seconds(),
-            'headers': dict(response.headers)
+            'headers': dict(response.headers),
+            **self._body_info(body),
         }
\ No newline at end of file
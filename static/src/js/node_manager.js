@@ -297,6 +297,8 @@ export class NodeManager {
                     isConfigured = !!nodeConfig.config.token;
                 } else if (nodeConfig.config.authType === 'api-key') {
                     isConfigured = !!nodeConfig.config.apiKey;
+                } else if (nodeConfig.config.authType === 'oauth2') {
+                    isConfigured = !!(nodeConfig.config.tokenUrl && nodeConfig.config.clientId);
                 }
                 statusText = isConfigured ? 'Auth Configured' : 'Missing Auth Detail';
                 break;
@@ -304,6 +306,7 @@ export class NodeManager {
             case 'put':
             case 'post':
             case 'delete':
+            case 'paginate':
                 isConfigured = nodeConfig.config.url && nodeConfig.config.url.length > 0;
                 if ((nodeConfig.type === 'post' || nodeConfig.type === 'put') && !nodeConfig.config.body) {
                     isConfigured = false;
@@ -17,6 +17,7 @@ export class NodeTemplates {
             post: { icon: '📤', title: 'POST Request' },
             put: { icon: '✏️', title: 'PUT Request' },
             delete: { icon: '🗑️', title: 'DELETE Request' },
+            paginate: { icon: '📚', title: 'Paginate' },
             params: { icon: '❓', title: 'Query Parameters' },
             body: { icon: '📝', title: 'Request Body' },
             headers: { icon: '📋', title: 'Custom Headers' }
@@ -33,7 +34,8 @@ export class NodeTemplates {
             get: '📥',
             post: '📤',
             put: '✏️',
-            delete: '🗑️'
+            delete: '🗑️',
+            paginate: '📚'
         };
         return icons[type] || '🔘';
     }
@@ -47,19 +49,28 @@ export class NodeTemplates {
             get: 'GET Request',
             post: 'POST Request',
             put: 'PUT Request',
-            delete: 'DELETE Request'
+            delete: 'DELETE Request',
+            paginate: 'Paginate'
         };
         return titles[type] || 'Node';
     }
 
     getDefaultConfig(type) {
         const defaults = {
-            endpoint: { baseUrl: '', authType: 'none' },
+            endpoint: {
+                baseUrl: '', authType: 'none', maxConcurrency: 8, maxConcurrencyPerHost: 4,
+                rateLimit: 0, rateBurst: 1, breakerThreshold: 0, breakerCooldown: 30, workflowDeadline: 0,
+            },
             auth: { authType: 'none' },
-            get: { url: '', timeout: 10000 },
-             post: { url: '', timeout: 10000, body: '' , bodyType: 'json', formFields: [] },
-            put: { url: '', timeout: 10000, body: '', bodyType: 'json', formFields: []  },
-            delete: { url: '', timeout: 10000 },
+            get: { url: '', timeout: 10000, cacheTtl: 0, extract: [] },
+             post: { url: '', timeout: 10000, body: '' , bodyType: 'json', formFields: [], extract: [] },
+            put: { url: '', timeout: 10000, body: '', bodyType: 'json', formFields: [], extract: []  },
+            delete: { url: '', timeout: 10000, extract: [] },
+            paginate: {
+                url: '', timeout: 10000, paginationType: 'next_link', itemsPath: '', nextPath: '',
+                cursorPath: '$.next_cursor', cursorParam: 'cursor', offsetParam: 'offset', limitParam: 'limit',
+                pageSize: 100, maxPages: 10, maxItems: 0, prefetch: '', extract: [],
+            },
             params: { params: [] },
             headers: { headers: [] },
             body: { body: '' },
@@ -98,6 +109,7 @@ export class NodeTemplates {
             case 'post':
             case 'put':
             case 'delete':
+            case 'paginate':
                 html = this.getHttpMethodConfiguration(nodeId, type);
                 break;
             case 'params':
@@ -142,6 +154,10 @@ export class NodeTemplates {
         const nodeConfig = this.state.nodeConfigs[nodeId];
         const currentUrl = nodeConfig.config.url || '';
         const currentTimeout = nodeConfig.config.timeout || 10000;
+        const retryMax = nodeConfig.config.retryMax || 1;
+        const retryStatuses = nodeConfig.config.retryStatuses || '';
+        const retryBackoff = nodeConfig.config.retryBackoff || 500;
+        const retryBackoffMax = nodeConfig.config.retryBackoffMax || 10000;
 
         console.log('📡 HTTP Method Config - URL:', currentUrl, 'Timeout:', currentTimeout);
 
@@ -167,6 +183,33 @@ export class NodeTemplates {
                        placeholder="10000"
                        value="${currentTimeout}">
 
+                <label for="retry-max-${nodeId}" class="config-label">Max Attempts</label>
+                <input type="number" id="retry-max-${nodeId}" class="config-input"
+                       data-config-key="retryMax" min="1"
+                       value="${retryMax}">
+
+                <label for="retry-statuses-${nodeId}" class="config-label">Retry on Status Codes</label>
+                <input type="text" id="retry-statuses-${nodeId}" class="config-input"
+                       data-config-key="retryStatuses"
+                       placeholder="429,502,503,504"
+                       value="${this.escapeHtml(retryStatuses)}">
+
+                <label for="retry-backoff-${nodeId}" class="config-label">Retry Backoff (ms)</label>
+                <input type="number" id="retry-backoff-${nodeId}" class="config-input"
+                       data-config-key="retryBackoff" min="0"
+                       value="${retryBackoff}">
+
+                <label for="retry-backoff-max-${nodeId}" class="config-label">Max Retry Backoff (ms)</label>
+                <input type="number" id="retry-backoff-max-${nodeId}" class="config-input"
+                       data-config-key="retryBackoffMax" min="0"
+                       value="${retryBackoffMax}">
+
+                ${method === 'get' ? this.getCacheConfiguration(nodeId) : ''}
+
+                ${method === 'paginate' ? this.getPaginationConfiguration(nodeId) : ''}
+
+                ${this.getResponseSizeConfiguration(nodeId)}
+
                 ${(method === 'post' || method === 'put') ? this.getBodyConfiguration(nodeId) : ''}
 
                 <button class="test-button" data-action="testApi">
@@ -181,9 +224,123 @@ export class NodeTemplates {
         `;
     }
 
+    getCacheConfiguration(nodeId) {
+        const nodeConfig = this.state.nodeConfigs[nodeId];
+        const cacheTtl = nodeConfig.config.cacheTtl || 0;
+
+        return `
+                <label for="cache-ttl-${nodeId}" class="config-label">Response Cache TTL (s, 0 = off)</label>
+                <input type="number" id="cache-ttl-${nodeId}" class="config-input"
+                       data-config-key="cacheTtl" min="0"
+                       placeholder="0"
+                       value="${cacheTtl}">
+        `;
+    }
+
+    getPaginationConfiguration(nodeId) {
+        const config = this.state.nodeConfigs[nodeId].config;
+        const paginationType = config.paginationType || 'next_link';
+
+        return `
+                <label for="pagination-type-${nodeId}" class="config-label">Pagination</label>
+                <select id="pagination-type-${nodeId}" class="config-select" data-config-key="paginationType">
+                    <option value="next_link" ${paginationType === 'next_link' ? 'selected' : ''}>Next link (Link header or body)</option>
+                    <option value="cursor" ${paginationType === 'cursor' ? 'selected' : ''}>Cursor</option>
+                    <option value="offset" ${paginationType === 'offset' ? 'selected' : ''}>Offset / limit</option>
+                </select>
+
+                <label for="items-path-${nodeId}" class="config-label">Items Path</label>
+                <input type="text" id="items-path-${nodeId}" class="config-input"
+                       data-config-key="itemsPath"
+                       placeholder="$.results"
+                       value="${this.escapeHtml(config.itemsPath || '')}">
+
+                ${paginationType === 'next_link' ? `
+                <label for="next-path-${nodeId}" class="config-label">Next Link Path (empty = Link header)</label>
+                <input type="text" id="next-path-${nodeId}" class="config-input"
+                       data-config-key="nextPath"
+                       placeholder="$.next"
+                       value="${this.escapeHtml(config.nextPath || '')}">` : ''}
+
+                ${paginationType === 'cursor' ? `
+                <label for="cursor-path-${nodeId}" class="config-label">Cursor Path</label>
+                <input type="text" id="cursor-path-${nodeId}" class="config-input"
+                       data-config-key="cursorPath"
+                       placeholder="$.next_cursor"
+                       value="${this.escapeHtml(config.cursorPath || '')}">
+
+                <label for="cursor-param-${nodeId}" class="config-label">Cursor Query Param</label>
+                <input type="text" id="cursor-param-${nodeId}" class="config-input"
+                       data-config-key="cursorParam"
+                       placeholder="cursor"
+                       value="${this.escapeHtml(config.cursorParam || '')}">` : ''}
+
+                ${paginationType === 'offset' ? `
+                <label for="offset-param-${nodeId}" class="config-label">Offset Query Param</label>
+                <input type="text" id="offset-param-${nodeId}" class="config-input"
+                       data-config-key="offsetParam"
+                       placeholder="offset"
+                       value="${this.escapeHtml(config.offsetParam || '')}">
+
+                <label for="limit-param-${nodeId}" class="config-label">Limit Query Param</label>
+                <input type="text" id="limit-param-${nodeId}" class="config-input"
+                       data-config-key="limitParam"
+                       placeholder="limit"
+                       value="${this.escapeHtml(config.limitParam || '')}">
+
+                <label for="page-size-${nodeId}" class="config-label">Page Size</label>
+                <input type="number" id="page-size-${nodeId}" class="config-input"
+                       data-config-key="pageSize" min="1"
+                       value="${config.pageSize || 100}">` : ''}
+
+                <label for="max-pages-${nodeId}" class="config-label">Max Pages</label>
+                <input type="number" id="max-pages-${nodeId}" class="config-input"
+                       data-config-key="maxPages" min="1" max="1000"
+                       value="${config.maxPages || 10}">
+
+                <label for="max-items-${nodeId}" class="config-label">Max Items (0 = no limit)</label>
+                <input type="number" id="max-items-${nodeId}" class="config-input"
+                       data-config-key="maxItems" min="0"
+                       value="${config.maxItems || 0}">
+
+                <label for="prefetch-${nodeId}" class="config-label">Prefetch Next Page</label>
+                <select id="prefetch-${nodeId}" class="config-select" data-config-key="prefetch">
+                    <option value="" ${!config.prefetch ? 'selected' : ''}>No</option>
+                    <option value="1" ${config.prefetch ? 'selected' : ''}>Yes</option>
+                </select>
+        `;
+    }
+
+    getResponseSizeConfiguration(nodeId) {
+        const nodeConfig = this.state.nodeConfigs[nodeId];
+        const maxBodyBytes = nodeConfig.config.maxBodyBytes || 1048576;
+        const spoolBody = nodeConfig.config.spoolBody || '';
+
+        return `
+                <label for="max-body-${nodeId}" class="config-label">Max Response Size (bytes)</label>
+                <input type="number" id="max-body-${nodeId}" class="config-input"
+                       data-config-key="maxBodyBytes" min="1"
+                       placeholder="1048576"
+                       value="${maxBodyBytes}">
+
+                <label for="spool-body-${nodeId}" class="config-label">Keep Full Body</label>
+                <select id="spool-body-${nodeId}" class="config-select" data-config-key="spoolBody">
+                    <option value="" ${!spoolBody ? 'selected' : ''}>No, preview only</option>
+                    <option value="1" ${spoolBody ? 'selected' : ''}>Yes, keep it as an attachment</option>
+                </select>
+        `;
+    }
+
     getEndpointConfiguration(nodeId) {
         const nodeConfig = this.state.nodeConfigs[nodeId];
         const currentBaseUrl = nodeConfig.config.baseUrl || '';
+        const maxConcurrency = nodeConfig.config.maxConcurrency || 8;
+        const maxConcurrencyPerHost = nodeConfig.config.maxConcurrencyPerHost || 4;
+        const rateLimit = nodeConfig.config.rateLimit || 0;
+        const rateBurst = nodeConfig.config.rateBurst || 1;
+        const breakerThreshold = nodeConfig.config.breakerThreshold || 0;
+        const breakerCooldown = nodeConfig.config.breakerCooldown || 30;
+        const workflowDeadline = nodeConfig.config.workflowDeadline || 0;
 
         console.log('🌐 Endpoint Config - Base URL:', currentBaseUrl);
 
@@ -198,6 +355,41 @@ export class NodeTemplates {
                        data-config-key="baseUrl"
                        placeholder="https://api.example.com"
                        value="${this.escapeHtml(currentBaseUrl)}">
+
+                <label for="max-concurrency-${nodeId}" class="config-label">Max Parallel Requests</label>
+                <input type="number" id="max-concurrency-${nodeId}" class="config-input"
+                       data-config-key="maxConcurrency" min="1"
+                       value="${maxConcurrency}">
+
+                <label for="max-concurrency-host-${nodeId}" class="config-label">Max Parallel Requests per Host</label>
+                <input type="number" id="max-concurrency-host-${nodeId}" class="config-input"
+                       data-config-key="maxConcurrencyPerHost" min="1"
+                       value="${maxConcurrencyPerHost}">
+
+                <label for="rate-limit-${nodeId}" class="config-label">Rate Limit per Host (requests/sec)</label>
+                <input type="number" id="rate-limit-${nodeId}" class="config-input"
+                       data-config-key="rateLimit" min="0" step="0.1"
+                       value="${rateLimit}">
+
+                <label for="rate-burst-${nodeId}" class="config-label">Rate Limit Burst</label>
+                <input type="number" id="rate-burst-${nodeId}" class="config-input"
+                       data-config-key="rateBurst" min="1"
+                       value="${rateBurst}">
+
+                <label for="breaker-threshold-${nodeId}" class="config-label">Circuit Breaker: Failures Before Opening</label>
+                <input type="number" id="breaker-threshold-${nodeId}" class="config-input"
+                       data-config-key="breakerThreshold" min="0"
+                       value="${breakerThreshold}">
+
+                <label for="breaker-cooldown-${nodeId}" class="config-label">Circuit Breaker Cooldown (s)</label>
+                <input type="number" id="breaker-cooldown-${nodeId}" class="config-input"
+                       data-config-key="breakerCooldown" min="1"
+                       value="${breakerCooldown}">
+
+                <label for="workflow-deadline-${nodeId}" class="config-label">Workflow Deadline (s, 0 = none)</label>
+                <input type="number" id="workflow-deadline-${nodeId}" class="config-input"
+                       data-config-key="workflowDeadline" min="0"
+                       value="${workflowDeadline}">
             </div>
             ${this.getAuthConfiguration(nodeId)}
         `;
@@ -222,12 +414,14 @@ export class NodeTemplates {
                     <option value="basic" ${authType === 'basic' ? 'selected' : ''}>Basic Auth</option>
                     <option value="bearer" ${authType === 'bearer' ? 'selected' : ''}>Bearer Token</option>
                     <option value="api-key" ${authType === 'api-key' ? 'selected' : ''}>API Key</option>
+                    <option value="oauth2" ${authType === 'oauth2' ? 'selected' : ''}>OAuth2 Client Credentials</option>
                 </select>
 
                 <div class="auth-fields">
                     ${authType === 'basic' ? this.getBasicAuthFields(nodeId) : ''}
                     ${authType === 'bearer' ? this.getBearerAuthFields(nodeId) : ''}
                     ${authType === 'api-key' ? this.getApiKeyAuthFields(nodeId) : ''}
+                    ${authType === 'oauth2' ? this.getOAuth2AuthFields(nodeId) : ''}
                 </div>
             </div>
         `;
@@ -267,6 +461,41 @@ export class NodeTemplates {
         `;
     }
 
+    getOAuth2AuthFields(nodeId) {
+        const config = this.state.nodeConfigs[nodeId].config;
+        const clientAuthMethod = config.clientAuthMethod || 'basic';
+
+        return `
+            <label for="token-url-${nodeId}" class="config-label">Token URL</label>
+            <input type="text" id="token-url-${nodeId}" class="config-input"
+                   data-config-key="tokenUrl"
+                   placeholder="https://auth.example.com/oauth/token"
+                   value="${this.escapeHtml(config.tokenUrl || '')}">
+
+            <label for="client-id-${nodeId}" class="config-label">Client ID</label>
+            <input type="text" id="client-id-${nodeId}" class="config-input"
+                   data-config-key="clientId"
+                   value="${this.escapeHtml(config.clientId || '')}">
+
+            <label for="client-secret-${nodeId}" class="config-label">Client Secret</label>
+            <input type="password" id="client-secret-${nodeId}" class="config-input"
+                   data-config-key="clientSecret"
+                   value="${this.escapeHtml(config.clientSecret || '')}">
+
+            <label for="scope-${nodeId}" class="config-label">Scope</label>
+            <input type="text" id="scope-${nodeId}" class="config-input"
+                   data-config-key="scope"
+                   placeholder="read write"
+                   value="${this.escapeHtml(config.scope || '')}">
+
+            <label for="client-auth-${nodeId}" class="config-label">Send Credentials</label>
+            <select id="client-auth-${nodeId}" class="config-select" data-config-key="clientAuthMethod">
+                <option value="basic" ${clientAuthMethod === 'basic' ? 'selected' : ''}>Basic auth header</option>
+                <option value="body" ${clientAuthMethod === 'body' ? 'selected' : ''}>Request body</option>
+            </select>
+        `;
+    }
+
     getApiKeyAuthFields(nodeId) {
         const nodeConfig = this.state.nodeConfigs[nodeId];
         const apiKey = nodeConfig.config.apiKey || '';
@@ -469,7 +698,8 @@ export class NodeTemplates {
 
         const nodeConfig = this.state.nodeConfigs[nodeId];
         if (nodeConfig) {
-            const fieldsToClear = ['username', 'password', 'token', 'apiKey', 'keyLocation'];
+            const fieldsToClear = ['username', 'password', 'token', 'apiKey', 'keyLocation',
+                'tokenUrl', 'clientId', 'clientSecret', 'scope', 'clientAuthMethod'];
             fieldsToClear.forEach(field => {
                 if (nodeConfig.config[field]) {
                     console.log('🧹 Clearing auth field:', field);
@@ -30,6 +30,7 @@ class WorkflowBuilder extends Component {
             configUpdateCounter: 0,
 
             workflowId: this.props?.action?.params?.workflow_id || null,
+            workflowVersion: this.props?.action?.params?.workflow_version || null,
             workflowName: this.props?.action?.params?.workflow_name || null,
         });
 
@@ -366,7 +367,8 @@ class WorkflowBuilder extends Component {
         nodeConfig.config.authType = authType;
 
         // Reset all auth fields
-        const authFields = ['username', 'password', 'token', 'apiKey', 'keyLocation',  'keyName', 'headerPrefix'];
+        const authFields = ['username', 'password', 'token', 'apiKey', 'keyLocation',  'keyName', 'headerPrefix',
+            'tokenUrl', 'clientId', 'clientSecret', 'scope', 'clientAuthMethod'];
         authFields.forEach(field => {
             if (nodeConfig.config[field] !== undefined) {
                 // Set default values for API key fields
@@ -664,6 +666,7 @@ class WorkflowBuilder extends Component {
     //========================
     clearCanvas() { return this.nodeManager.clearCanvas(); }
     testWorkflow() { return this.workflowIO.testWorkflow(); }
+    testWorkflowInBackground() { return this.workflowIO.testWorkflowInBackground(); }
     exportWorkflow() { return this.workflowIO.exportWorkflow(); }
     saveWorkflow() { return this.workflowIO.saveWorkflow(); }
     importWorkflow(event) { return this.workflowIO.importWorkflow(event); }
@@ -31,6 +31,42 @@ export class WorkflowIO {
         }
     }
 
+    async testWorkflowInBackground() {
+        if (!this.validateWorkflow()) {
+            this.notification.add("Workflow validation failed!", { type: 'danger' });
+            return;
+        }
+
+        try {
+            const runId = await this.orm.call('api.workflow.run', 'enqueue', [{
+                nodes: Object.values(this.state.nodeConfigs),
+                connections: this.state.connections
+            }, this.state.workflowId || false]);
+            this.notification.add("Workflow test queued, running in background...", { type: 'info' });
+            this.pollRunProgress(runId);
+        } catch (error) {
+            this.notification.add("Failed to queue workflow test", { type: 'danger' });
+            console.error('Queue error:', error);
+        }
+    }
+
+    async pollRunProgress(runId, interval = 2000) {
+        try {
+            const progress = await this.orm.call('api.workflow.run', 'get_run_progress', [runId]);
+            console.log(`⏳ Run ${runId}: ${progress.completed_nodes}/${progress.total_nodes} nodes`, progress.nodes);
+            if (progress.state === 'done') {
+                this.notification.add(`Workflow test completed: ${progress.message || 'Success'}`, { type: 'success' });
+                console.log('Test results:', progress.result);
+            } else if (progress.state === 'failed') {
+                this.notification.add(`Workflow test failed: ${progress.message || 'Unknown error'}`, { type: 'danger' });
+            } else {
+                setTimeout(() => this.pollRunProgress(runId, interval), interval);
+            }
+        } catch (error) {
+            console.error('Progress poll error:', error);
+        }
+    }
+
     validateWorkflow() {
         const hasStart = Object.values(this.state.nodeConfigs).some(node => node.type === 'start');
         const hasEnd = Object.values(this.state.nodeConfigs).some(node => node.type === 'end');
@@ -175,8 +211,14 @@ export class WorkflowIO {
                     workflowName = prompt('Enter workflow name:', `Workflow-${new Date().toLocaleDateString()}`);
                     if (!workflowName) return;
                 }
+                // ⚡ Existing workflow with a known baseline: only send what changed
+                if (existingId && this.lastSaved && this.state.workflowVersion) {
+                    await this.saveWorkflowDelta(existingId, workflowName, nodes);
+                    return;
+                }
                 const workflowData = {
                     id: existingId,  // ✅ Pass ID if updating existing record
+                    version: this.state.workflowVersion || undefined,
                     name: workflowName,
                     description: 'API Workflow created from workflow builder',
                     workflow_data: JSON.stringify({
@@ -195,6 +237,11 @@ export class WorkflowIO {
                 if (result) {
                     console.log(result)
                     this.state.workflowId = result;
+                    // The server bumps the version by one on every save
+                    this.state.workflowVersion = existingId
+                        ? (this.state.workflowVersion ? this.state.workflowVersion + 1 : null)
+                        : 1;
+                    this.lastSaved = this.takeSnapshot(nodes, this.state.connections);
                     this.showNotification(
                         existingId
                             ? `Workflow "${workflowName}" updated successfully!`
@@ -209,6 +256,58 @@ export class WorkflowIO {
             }
         }
 
+    async saveWorkflowDelta(workflowId, workflowName, nodes) {
+            const ops = this.buildDelta(nodes, this.state.connections);
+            if (ops.length === 0) {
+                this.showNotification('No changes to save', 'info');
+                return;
+            }
+            console.log(`📤 Sending ${ops.length} delta operations to backend:`, ops);
+            const result = await this.orm.call('api.workflow', 'save_workflow_delta',
+                [workflowId, this.state.workflowVersion, ops]);
+            if (result.status === 'conflict') {
+                this.showNotification(
+                    `Workflow "${workflowName}" was changed by someone else (version ${result.version}). Reload it before saving.`,
+                    'warning'
+                );
+                return;
+            }
+            this.state.workflowVersion = result.version;
+            this.lastSaved = this.takeSnapshot(nodes, this.state.connections);
+            this.showNotification(`Workflow "${workflowName}" updated successfully!`, 'success');
+        }
+
+    takeSnapshot(nodes, connections) {
+            // Serialized form of every node/connection as last saved, to diff against
+            const snapshot = { nodes: {}, connections: {} };
+            nodes.forEach(node => { snapshot.nodes[node.id] = JSON.stringify(node); });
+            connections.forEach(conn => { snapshot.connections[conn.id] = JSON.stringify(conn); });
+            return snapshot;
+        }
+
+    buildDelta(nodes, connections) {
+            const saved = this.lastSaved;
+            const current = this.takeSnapshot(nodes, connections);
+            const ops = [];
+            nodes.forEach(node => {
+                if (!(node.id in saved.nodes)) {
+                    ops.push({ op: 'add_node', node });
+                } else if (saved.nodes[node.id] !== current.nodes[node.id]) {
+                    ops.push({ op: 'update_node', node });
+                }
+            });
+            Object.keys(saved.connections).forEach(id => {
+                if (!(id in current.connections)) ops.push({ op: 'remove_connection', id });
+            });
+            connections.forEach(conn => {
+                if (!(conn.id in saved.connections)) ops.push({ op: 'add_connection', connection: conn });
+            });
+            Object.keys(saved.nodes).forEach(id => {
+                if (!(id in current.nodes)) ops.push({ op: 'remove_node', id });
+            });
+            return ops;
+        }
+
     showNotification(message, type = 'info') {
             // Use Odoo's notification system
             if (this.env && this.env.services && this.env.services.notification) {
@@ -223,6 +322,8 @@ export class WorkflowIO {
             try {
                 console.log('📥 Importing workflow data:', workflowData);
                 this.loadWorkflowData(workflowData);
+                const saved = typeof workflowData === 'string' ? JSON.parse(workflowData) : workflowData;
+                this.lastSaved = this.takeSnapshot(saved.nodes || [], saved.connections || []);
                 this.notification.add("Workflow loaded successfully!", { type: 'success' });
             } catch (error) {
                 console.error('❌ Error importing workflow data:', error);
@@ -0,0 +1 @@
+""" Plain python helpers shared by the workflow models """
@@ -0,0 +1,83 @@
+""" Shared request limits and deduplication for a batch of workflow runs """
+from contextlib import contextmanager
+import threading
+import time
+
+from .retry import DeadlineExceeded
+
+DEFAULT_MAX_REQUESTS = 32
+DEFAULT_MAX_PER_HOST = 8
+# Node types whose identical requests can be sent once for the whole batch: no side effects
+DEDUPLICABLE_NODE_TYPES = ('get', 'paginate')
+
+
+class RequestBatch:
+    """
+    State shared by every workflow of one batch test: at most
+    max_requests requests in flight overall and max_per_host per host,
+    and identical idempotent requests sent once, later (or concurrent)
+    askers getting the same result.
+    """
+
+    def __init__(self, max_requests=DEFAULT_MAX_REQUESTS, max_per_host=DEFAULT_MAX_PER_HOST):
+        self.slots = threading.BoundedSemaphore(max(int(max_requests), 1))
+        self.max_per_host = max(int(max_per_host), 1)
+        self.host_slots = {}
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.results = {}
+        self.requests = 0
+        self.deduplicated = 0
+
+    @contextmanager
+    def slot(self, host):
+        """Hold a per-host and a global request slot"""
+        with self.lock:
+            host_slot = self.host_slots.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+        with host_slot, self.slots:
+            yield
+
+    def send(self, host, execute):
+        """execute() within the request limits of host"""
+        with self.slot(host):
+            result = execute()
+        with self.lock:
+            self.requests += 1
+        return result
+
+    def run(self, key, execute, shareable=None, deadline=None):
+        """
+        Result of execute() for key, computed once per batch. Returns
+        (result, shared), shared being True when it was another caller's.
+        Callers wait for a result in progress without holding a slot. A
+        result shareable(result) rejects, e.g. one cancelled by its
+        caller's own deadline, is not handed on: the next waiting caller
+        executes the request itself. A caller stops waiting at its own
+        deadline (a time.monotonic() value) with DeadlineExceeded.
+        """
+        while True:
+            with self.lock:
+                if key in self.results:
+                    self.deduplicated += 1
+                    return self.results[key], True
+                pending = self.pending.get(key)
+                if pending is None:
+                    pending = self.pending[key] = threading.Event()
+                    break
+            if not pending.wait(None if deadline is None else max(deadline - time.monotonic(), 0)):
+                raise DeadlineExceeded("Workflow deadline exceeded waiting for a shared request")
+        try:
+            result = execute()
+        except Exception as e:
+            result = {
+                'status': 'error',
+                'message': f'Unexpected error: {str(e)}',
+                'error': str(e),
+                'error_type': type(e).__name__,
+            }
+        with self.lock:
+            if shareable is None or shareable(result):
+                self.results[key] = result
+            del self.pending[key]
+        pending.set()
+        return result, False
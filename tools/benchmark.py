@@ -0,0 +1,224 @@
+""" Benchmarks of the workflow execution path against a local mock API """
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+import tracemalloc
+
+from . import http_pool
+
+DEFAULT_SIZES = (10, 100, 1000)
+# API nodes per level of a 'layered' workflow
+DEFAULT_LEVEL_WIDTH = 10
+WORKFLOW_SHAPES = ('layered', 'wide', 'chain')
+# 'mock' runs against the mock API, 'cassette' replays its recorded responses without any network
+BACKENDS = ('mock', 'cassette')
+
+
+class MockAPIServer:
+    """
+    Threaded HTTP server on 127.0.0.1 answering every method after
+    latency_ms with payload_bytes of JSON, or with a 500 for error_rate
+    of the requests. Usable as a context manager.
+    """
+
+    def __init__(self, latency_ms=5, payload_bytes=1024, error_rate=0.0, seed=0):
+        self.latency = max(float(latency_ms), 0.0) / 1000.0
+        self.error_rate = min(max(float(error_rate), 0.0), 1.0)
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.requests = 0
+        filler = max(int(payload_bytes) - len('{"data":""}'), 0)
+        self.payload = json.dumps({'data': 'x' * filler}).encode()
+        self.server = None
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def start(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes, don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def handle_request(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                with mock.random_lock:
+                    mock.requests += 1
+                    failed = mock.random.random() < mock.error_rate
+                if mock.latency:
+                    time.sleep(mock.latency)
+                body = b'{"error":"mock failure"}' if failed else mock.payload
+                self.send_response(500 if failed else 200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        # Deep backlog: a wide level opens many connections at once
+        self.server.request_queue_size = 1024
+        self.thread = threading.Thread(target=self.server.serve_forever, name='api_workflow_mock', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def synthetic_workflow(base_url, size, shape='layered', width=DEFAULT_LEVEL_WIDTH, config=None):
+    """
+    Builder-shaped workflow of `size` nodes: one endpoint node and
+    size - 1 API nodes (GET, with every fifth a POST).
+        layered: levels of `width` nodes, each level depending on the previous one
+        wide:    every API node hangs off the endpoint, a single level
+        chain:   every API node depends on the previous one
+    config is merged into the endpoint config (e.g. maxConcurrency).
+    """
+    if shape not in WORKFLOW_SHAPES:
+        raise ValueError(f"Unknown workflow shape: {shape}")
+    nodes = [{'id': 'endpoint', 'type': 'endpoint', 'x': 0, 'y': 0,
+              'config': {'baseUrl': base_url, **(config or {})}}]
+    connections = []
+    for index in range(1, max(int(size), 2)):
+        node_id = f'node_{index}'
+        node_type = 'post' if index % 5 == 0 else 'get'
+        node_config = {'url': f'/items/{index}'}
+        if node_type == 'post':
+            node_config['body'] = json.dumps({'index': index})
+        nodes.append({'id': node_id, 'type': node_type, 'x': 0, 'y': 0, 'config': node_config})
+        if shape == 'wide':
+            source = 'endpoint'
+        elif shape == 'chain':
+            source = nodes[-2]['id']
+        else:
+            # Hang off the first node of the previous level
+            level = (index - 1) // width
+            source = f'node_{(level - 1) * width + 1}' if level else 'endpoint'
+        connections.append({'id': f'c_{source}_{node_id}', 'source': source, 'target': node_id})
+    return {'nodes': nodes, 'connections': connections}
+
+
+def _raw_requests(base_url, requests_count, workers):
+    """Wall time of the same number of bare pooled requests, the floor the engine is measured against"""
+    def call(index):
+        method = 'POST' if index % 5 == 0 else 'GET'
+        response = http_pool.request(method, f'{base_url}/items/{index}', timeout=30)
+        response.close()
+
+    started = time.perf_counter()
+    if workers <= 1:
+        for index in range(1, requests_count + 1):
+            call(index)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(call, range(1, requests_count + 1)))
+    return time.perf_counter() - started
+
+
+def run_case(execute, server, size, shape='layered', width=DEFAULT_LEVEL_WIDTH, config=None,
+             parallelism=1, memory=True, replay=False):
+    """
+    Benchmark one synthetic workflow. execute(workflow_data) must run it
+    and return the test_workflow result. The per-request overhead is the
+    time spent beyond the same requests issued bare with `parallelism`
+    threads. Peak memory is taken in a second run under tracemalloc so
+    its overhead does not skew the timings. With replay, execute serves
+    the responses from a cassette: nothing reaches the server and the
+    whole time per request is engine overhead.
+    """
+    workflow = synthetic_workflow(server.url, size, shape, width, config)
+    requests_before = server.requests
+    started = time.perf_counter()
+    result = execute(workflow)
+    wall = time.perf_counter() - started
+    if not result.get('success'):
+        return {'size': size, 'shape': shape, 'error': result.get('error')}
+
+    if replay:
+        requests_count = len([r for r in result['results'] if r.get('status') != 'skipped'])
+        raw_wall = 0.0
+    else:
+        requests_count = server.requests - requests_before
+        if shape == 'chain':
+            parallelism = 1
+        elif shape == 'layered':
+            parallelism = min(parallelism, width)
+        raw_wall = _raw_requests(server.url, requests_count, parallelism)
+    peak_kib = None
+    if memory:
+        tracemalloc.start()
+        try:
+            execute(workflow)
+            peak_kib = tracemalloc.get_traced_memory()[1] / 1024.0
+        finally:
+            tracemalloc.stop()
+
+    failures = len([r for r in result['results'] if r.get('status') == 'error'])
+    return {
+        'size': size,
+        'shape': shape,
+        'requests': requests_count,
+        'failures': failures,
+        'wall_s': round(wall, 4),
+        'requests_per_s': round(requests_count / wall, 1) if wall else None,
+        'raw_wall_s': round(raw_wall, 4),
+        'overhead_ms_per_request': round((wall - raw_wall) * 1000.0 / requests_count, 3) if requests_count else None,
+        'peak_memory_kib': round(peak_kib, 1) if peak_kib is not None else None,
+    }
+
+
+def compare(report, baseline, tolerance=0.25):
+    """
+    Regressions of report against an earlier report: cases whose wall
+    time, per-request overhead or peak memory grew by more than
+    tolerance (a fraction). Reports of different backends do not compare.
+    """
+    if report.get('backend', 'mock') != baseline.get('backend', 'mock'):
+        return []
+    previous = {(case['size'], case['shape']): case for case in baseline.get('cases', [])}
+    regressions = []
+    for case in report.get('cases', []):
+        before = previous.get((case['size'], case['shape']))
+        if not before or case.get('error') or before.get('error'):
+            continue
+        for metric in ('wall_s', 'overhead_ms_per_request', 'peak_memory_kib'):
+            old, new = before.get(metric), case.get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append({'size': case['size'], 'shape': case['shape'], 'metric': metric,
+                                    'baseline': old, 'current': new})
+    return regressions
+
+
+def format_report(report):
+    """Plain text table of a benchmark report"""
+    columns = ('size', 'shape', 'requests', 'failures', 'wall_s', 'requests_per_s',
+               'overhead_ms_per_request', 'peak_memory_kib')
+    rows = [columns] + [
+        tuple(str(case.get(column, case.get('error', ''))) for column in columns) for case in report['cases']
+    ]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return '\n'.join('  '.join(value.rjust(width) for value, width in zip(row, widths)) for row in rows)
@@ -0,0 +1,262 @@
+""" Record/replay cassettes: recorded HTTP responses for network-free workflow runs """
+from datetime import timedelta
+from urllib.parse import urlparse, parse_qsl, urlencode
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# File layout: MAGIC, compressed entries, compressed JSON index, FOOTER (index offset and length).
+# The index maps each fingerprint to the locations of its responses, in the order they were recorded
+MAGIC = b'APIWFCS2'
+FOOTER = struct.Struct('<QQ')
+# Entry: META length, JSON meta (status, reason, headers), body; the whole entry zlib compressed
+META = struct.Struct('<I')
+COMPRESSION_LEVEL = 6
+CASSETTE_MODES = ('record', 'replay')
+
+_cassettes = {}
+_recorders = {}
+_replays = {}
+_lock = threading.Lock()
+
+
+class CassetteError(Exception):
+    """A cassette that cannot be written or read"""
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """Replay found no recorded response for a request"""
+
+
+def fingerprint(method, url, body=None):
+    """
+    Key of a recorded request: the method, the URL with its query sorted
+    and the body. Headers are left out so rotating tokens still match.
+    """
+    parsed = urlparse(url)
+    url = parsed._replace(query=urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))).geturl()
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    elif body is not None and not isinstance(body, str):
+        body = json.dumps(body, sort_keys=True, default=str)
+    payload = json.dumps([method.upper(), url, body])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def request_body(kwargs):
+    """The body of requests.request(**kwargs), as given"""
+    return kwargs.get('json') if kwargs.get('json') is not None else kwargs.get('data')
+
+
+class Recorder:
+    """
+    Appends responses to a cassette as they are recorded, every response
+    of a fingerprint in turn (a 503 then the retry's 200); the file only
+    becomes a cassette, atomically, when closed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        self.lock = threading.Lock()
+        self.index = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.temp_path, 'wb')
+        self.file.write(MAGIC)
+
+    def add(self, key, status_code, reason, headers, body):
+        meta = json.dumps({'status': status_code, 'reason': reason, 'headers': dict(headers)}).encode('utf-8')
+        blob = zlib.compress(META.pack(len(meta)) + meta + (body or b''), COMPRESSION_LEVEL)
+        with self.lock:
+            if self.file is None:
+                return
+            self.index.setdefault(key, []).append((self.file.tell(), len(blob)))
+            self.file.write(blob)
+
+    def close(self):
+        """Write the index and move the cassette in place; returns its entry count and size"""
+        with self.lock:
+            index = zlib.compress(json.dumps(self.index).encode('utf-8'), COMPRESSION_LEVEL)
+            offset = self.file.tell()
+            self.file.write(index)
+            self.file.write(FOOTER.pack(offset, len(index)))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+            os.replace(self.temp_path, self.path)
+            return {'entries': sum(len(locations) for locations in self.index.values()),
+                    'bytes': os.path.getsize(self.path)}
+
+    def discard(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            if os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+
+
+class Cassette:
+    """
+    A recorded cassette, memory mapped: opening reads the index only,
+    each replayed response is decompressed from the mapping on demand.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            try:
+                self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise CassetteError(f"Empty cassette: {path}") from e
+        if self.map[:len(MAGIC)] != MAGIC or len(self.map) < len(MAGIC) + FOOTER.size:
+            self.map.close()
+            raise CassetteError(f"Not a cassette: {path}")
+        offset, length = FOOTER.unpack_from(self.map, len(self.map) - FOOTER.size)
+        self.index = json.loads(zlib.decompress(self.map[offset:offset + length]))
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, key, occurrence=0):
+        """
+        (status_code, reason, headers, body) of the occurrence-th response
+        recorded for key, the last one once they are used up; None when missing
+        """
+        locations = self.index.get(key)
+        if not locations:
+            return None
+        offset, length = locations[min(occurrence, len(locations) - 1)]
+        entry = zlib.decompress(self.map[offset:offset + length])
+        (meta_length,) = META.unpack_from(entry)
+        meta = json.loads(entry[META.size:META.size + meta_length])
+        return meta['status'], meta['reason'], meta['headers'], entry[META.size + meta_length:]
+
+    def response(self, method, url, body=None, occurrence=0):
+        """A requests.Response replaying a recorded answer; raises CassetteMiss"""
+        started = time.perf_counter()
+        recorded = self.get(fingerprint(method, url, body), occurrence)
+        if recorded is None:
+            raise CassetteMiss(f"No recorded response for {method.upper()} {url} in {os.path.basename(self.path)}")
+        status_code, reason, headers, content = recorded
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response.url = url
+        response.encoding = get_encoding_from_headers(response.headers)
+        # Already read: iter_content() serves the body from memory and close() has nothing to release
+        response._content = content
+        response._content_consumed = True
+        response.elapsed = timedelta(seconds=time.perf_counter() - started)
+        return response
+
+    def close(self):
+        self.map.close()
+
+
+def open_cassette(path):
+    """Shared Cassette of path, re-opened when the file changed on disk"""
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except FileNotFoundError as e:
+        raise CassetteError(f"No cassette at {path}") from e
+    with _lock:
+        cached = _cassettes.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        cassette = Cassette(path)
+        _cassettes[path] = (stamp, cassette)
+        # The replaced mapping is left to the garbage collector, a replay may still be reading it
+        return cassette
+
+
+class Replay:
+    """
+    One replay of a cassette: each repeated request gets the next
+    response recorded for it, so retries see what they saw when recorded
+    """
+
+    def __init__(self, cassette):
+        self.cassette = cassette
+        self.lock = threading.Lock()
+        self.served = {}
+
+    def response(self, method, url, body=None):
+        key = fingerprint(method, url, body)
+        with self.lock:
+            occurrence = self.served.get(key, 0)
+            self.served[key] = occurrence + 1
+        return self.cassette.response(method, url, body, occurrence)
+
+
+def close_cassette(path):
+    """Unmap the shared Cassette of path, e.g. before deleting the file"""
+    with _lock:
+        cached = _cassettes.pop(path, None)
+    if cached is not None:
+        cached[1].close()
+
+
+def start_replay(path):
+    """Start a replay of the cassette at path; returns its token for replay() and stop_replay()"""
+    token = uuid.uuid4().hex
+    active = Replay(open_cassette(path))
+    with _lock:
+        _replays[token] = active
+    return token
+
+
+def replay(token):
+    """The Replay of a token from start_replay()"""
+    with _lock:
+        active = _replays.get(token)
+    if active is None:
+        raise CassetteError("Unknown or finished cassette replay")
+    return active
+
+
+def stop_replay(token):
+    with _lock:
+        _replays.pop(token, None)
+
+
+def start_recording(path):
+    with _lock:
+        if path in _recorders:
+            raise CassetteError(f"{path} is already being recorded")
+        _recorders[path] = Recorder(path)
+
+
+def recorder(path):
+    """The Recorder of a cassette being recorded"""
+    with _lock:
+        active = _recorders.get(path)
+    if active is None:
+        raise CassetteError(f"{path} is not being recorded")
+    return active
+
+
+def stop_recording(path, keep=True):
+    """Finish (or with keep=False, drop) a recording; returns the cassette's entry count and size"""
+    with _lock:
+        active = _recorders.pop(path, None)
+    if active is None:
+        return None
+    if not keep:
+        active.discard()
+        return None
+    return active.close()
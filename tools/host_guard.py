@@ -0,0 +1,201 @@
+""" Per-host rate limits and circuit breakers shared by every run in the worker """
+from urllib.parse import urlparse
+import threading
+import time
+
+from .retry import DeadlineExceeded
+
+# Endpoint node config keys, 0 (the default) turns the feature off
+HOST_LIMIT_KEYS = ('rateLimit', 'rateBurst', 'breakerThreshold', 'breakerCooldown')
+DEFAULT_BREAKER_COOLDOWN = 30
+# Responses that mean the host, not the request, is in trouble
+FAILURE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_guards = {}
+_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host whose breaker is open"""
+
+    def __init__(self, host, retry_after):
+        self.host = host
+        self.retry_after = retry_after
+        super().__init__(f"Circuit open for {host} after repeated failures, retry in {retry_after:.0f}s")
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` requests per second, bursts of up to `burst`"""
+
+    def __init__(self, rate, burst):
+        self.lock = threading.Lock()
+        self.rate = self.burst = 0.0
+        self.configure(rate, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def configure(self, rate, burst):
+        with self.lock:
+            self.rate = float(rate)
+            self.burst = max(float(burst or 0), 1.0)
+
+    def acquire(self, deadline=None):
+        """
+        Take one token, sleeping until one is available. Raises
+        DeadlineExceeded, without waiting, when that is past deadline
+        (a time.monotonic() value).
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            if deadline is not None and now + wait >= deadline:
+                raise DeadlineExceeded("Workflow deadline exceeded waiting for the host's rate limit")
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures; once `cooldown` seconds
+    have passed a single probe request is let through (half open), whose
+    outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.lock = threading.Lock()
+        self.threshold = int(threshold)
+        self.cooldown = float(cooldown)
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def configure(self, threshold, cooldown):
+        with self.lock:
+            self.threshold = int(threshold)
+            self.cooldown = float(cooldown)
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if self.probing or time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def allow(self):
+        """0 when the request may go out, otherwise the seconds left until the next probe"""
+        with self.lock:
+            if self.opened_at is None:
+                return 0
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self.probing:
+                return max(remaining, 1.0)
+            self.probing = True
+            return 0
+
+    def release(self):
+        """Give up a claimed probe whose request was never sent, without an outcome"""
+        with self.lock:
+            self.probing = False
+
+    def record(self, success):
+        with self.lock:
+            if success:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.probing or self.failures >= self.threshold:
+                    self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class HostGuard:
+    """Rate limiter and circuit breaker of one scheme+host"""
+
+    def __init__(self, key):
+        self.key = key
+        self.bucket = None
+        self.breaker = None
+
+    def configure(self, rate, burst, threshold, cooldown):
+        if rate > 0:
+            if self.bucket is None:
+                self.bucket = TokenBucket(rate, burst)
+            else:
+                self.bucket.configure(rate, burst)
+        else:
+            self.bucket = None
+        if threshold > 0:
+            if self.breaker is None:
+                self.breaker = CircuitBreaker(threshold, cooldown)
+            else:
+                self.breaker.configure(threshold, cooldown)
+        else:
+            self.breaker = None
+
+    def before_request(self, deadline=None):
+        """Fail fast while the breaker is open, then wait for a rate limit token until deadline"""
+        breaker = self.breaker
+        if breaker is not None:
+            retry_after = breaker.allow()
+            if retry_after:
+                raise CircuitOpenError(self.key, retry_after)
+        bucket = self.bucket
+        if bucket is not None:
+            try:
+                bucket.acquire(deadline)
+            except BaseException:
+                self.release()
+                raise
+
+    def release(self):
+        """Nothing was sent after before_request(): free the breaker's probe slot if this request held it"""
+        breaker = self.breaker
+        if breaker is not None:
+            breaker.release()
+
+    def record(self, status_code=None, error=None):
+        """Feed a request outcome (a status code, or the exception raised) to the breaker"""
+        breaker = self.breaker
+        if breaker is not None:
+            breaker.record(error is None and status_code not in FAILURE_STATUS_CODES)
+
+
+def _number(config, key, default=0):
+    try:
+        return max(float(config.get(key) or default), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+def get_guard(url, config):
+    """
+    Shared guard of the host of url, (re)configured from the node config
+    (see HOST_LIMIT_KEYS). Returns None when the config sets neither a
+    rate limit nor a breaker; the guard other runs may hold for the host
+    is left as it is.
+    """
+    rate = _number(config, 'rateLimit')
+    threshold = int(_number(config, 'breakerThreshold'))
+    parsed = urlparse(url)
+    key = f'{parsed.scheme}://{parsed.netloc}'.lower()
+    if not rate and not threshold:
+        return None
+    with _lock:
+        guard = _guards.get(key)
+        if guard is None:
+            guard = _guards[key] = HostGuard(key)
+        guard.configure(rate, _number(config, 'rateBurst', 1), threshold,
+                        _number(config, 'breakerCooldown', DEFAULT_BREAKER_COOLDOWN))
+        return guard
+
+
+def states():
+    """Breaker state per host, for reporting"""
+    with _lock:
+        guards = list(_guards.values())
+    return {guard.key: guard.breaker.state for guard in guards if guard.breaker is not None}
@@ -0,0 +1,182 @@
+""" Per-worker pooled HTTP sessions for workflow requests """
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlparse
+from contextlib import contextmanager
+import atexit
+import logging
+import threading
+import time
+import requests
+
+from . import instrumentation
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_KEEPALIVE = 60
+DEFAULT_MAX_RETRIES = 0
+
+_settings = {
+    'pool_size': DEFAULT_POOL_SIZE,
+    'keepalive': DEFAULT_KEEPALIVE,
+    'max_retries': DEFAULT_MAX_RETRIES,
+}
+_pools = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class HostPool:
+    """
+    A keep-alive requests session dedicated to one scheme+host. A pool
+    replaced by a new one is retired: it closes once its in-flight
+    requests are over.
+    """
+
+    def __init__(self, key, pool_size, keepalive, max_retries):
+        self.key = key
+        self.pool_size = pool_size
+        self.settings = (keepalive, max_retries)
+        self.keepalive = keepalive
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            # read=False: read errors surface as ReadTimeout/ConnectionError instead of a
+            # MaxRetryError, node retry policies decide whether to try again
+            max_retries=Retry(total=max_retries, read=False, backoff_factor=0.3, raise_on_status=False),
+        )
+        # Connections count themselves for the run stats, and time their DNS/TCP and TLS setup for request traces
+        self.adapter.poolmanager.pool_classes_by_scheme = instrumentation.POOL_CLASSES_BY_SCHEME
+        self.session.mount(f'{key}/', self.adapter)
+        if not keepalive:
+            # Keep-alive disabled: ask the server to close after each response
+            self.session.headers['Connection'] = 'close'
+        self.last_used = time.monotonic()
+        self.active = 0
+        self.retired = False
+
+    def is_stale(self):
+        """Idle longer than the keep-alive window, sockets are likely dead"""
+        return bool(self.keepalive) and time.monotonic() - self.last_used > self.keepalive
+
+    def request(self, method, url, **kwargs):
+        with _lock:
+            self.active += 1
+            self.last_used = time.monotonic()
+        opened = instrumentation.connections_opened()
+        response = None
+        try:
+            response = self.session.request(method=method, url=url, **kwargs)
+            return response
+        finally:
+            stats = getattr(_local, 'stats', None)
+            opened = instrumentation.connections_opened() - opened
+            if stats is not None and (response is not None or opened):
+                # Redirects are requests of their own; a failed request only counts once it opened a connection
+                stats.add(self.key, 1 + len(response.history) if response is not None else 1, opened)
+            with _lock:
+                self.active -= 1
+                close = self.retired and not self.active
+            if close:
+                self.close()
+
+    def retire(self):
+        """Close now if idle, else once the last in-flight request returns; call with _lock held"""
+        self.retired = True
+        if not self.active:
+            self.close()
+
+    def close(self):
+        self.session.close()
+
+
+class ConnectionStats:
+    """
+    Requests sent and connections opened per host by one run, counted on
+    the threads executing its nodes while they are within counting().
+    """
+
+    def __init__(self):
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def add(self, key, requests_count, connections):
+        with self.lock:
+            counts = self.hosts.setdefault(key, {'requests': 0, 'connections': 0})
+            counts['requests'] += requests_count
+            counts['connections'] += connections
+
+    def as_dict(self):
+        """Per-host requests, connections opened and requests on a reused connection"""
+        with self.lock:
+            return {key: {**counts, 'reused': max(counts['requests'] - counts['connections'], 0)}
+                    for key, counts in self.hosts.items()}
+
+
+@contextmanager
+def counting(stats):
+    """Count the requests this thread sends into stats, a ConnectionStats"""
+    previous = getattr(_local, 'stats', None)
+    _local.stats = stats
+    try:
+        yield stats
+    finally:
+        _local.stats = previous
+
+
+def configure(pool_size=None, keepalive=None, max_retries=None):
+    """
+    Update pool settings; existing pools pick them up on next checkout.
+    A pool never shrinks, a smaller pool_size only applies to new hosts.
+    """
+    with _lock:
+        if pool_size is not None:
+            _settings['pool_size'] = max(int(pool_size), 1)
+        if keepalive is not None:
+            _settings['keepalive'] = max(int(keepalive), 0)
+        if max_retries is not None:
+            _settings['max_retries'] = max(int(max_retries), 0)
+
+
+def _pool_key(url):
+    parsed = urlparse(url)
+    return f'{parsed.scheme}://{parsed.netloc}'.lower()
+
+
+def get_pool(url):
+    """Return the shared pool for the scheme+host of url"""
+    key = _pool_key(url)
+    with _lock:
+        settings = (_settings['keepalive'], _settings['max_retries'])
+        pool_size = _settings['pool_size']
+        pool = _pools.get(key)
+        if pool:
+            if pool.settings == settings and pool.pool_size >= pool_size and not pool.is_stale():
+                return pool
+            # The pool size is a high-water mark: a replaced pool hands its size on
+            pool_size = max(pool_size, pool.pool_size)
+            pool.retire()
+        pool = _pools[key] = HostPool(key, pool_size, *settings)
+        return pool
+
+
+def request(method, url, **kwargs):
+    """Drop-in replacement for requests.request using the shared pools"""
+    return get_pool(url).request(method, url, **kwargs)
+
+
+def close_all():
+    """Close every pooled session; registered as the worker shutdown hook"""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        try:
+            pool.close()
+        except Exception as e:
+            _logger.warning("Failed to close HTTP pool %s: %s", pool.key, e)
+
+
+atexit.register(close_all)
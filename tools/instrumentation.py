@@ -0,0 +1,231 @@
+""" Per-request timing spans, structured logs and optional Prometheus metrics """
+from urllib.parse import urlparse, urlencode, parse_qsl
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+import logging
+import os
+import re
+import threading
+import time
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+_logger = logging.getLogger(__name__)
+
+# Query parameters whose values never make it into logs or metrics
+SENSITIVE_PARAM = re.compile(r'key|token|secret|passw|signature|auth|session', re.IGNORECASE)
+
+_settings = {'metrics': False}
+_metrics = {}
+_metrics_lock = threading.Lock()
+_local = threading.local()
+
+
+def configure(metrics=None):
+    """Turn Prometheus counters on or off; needs the prometheus_client package"""
+    if metrics is None:
+        return
+    metrics = str(metrics).lower() in ('1', 'true', 'yes')
+    if metrics and prometheus_client is None:
+        if not _settings.get('warned'):
+            _logger.warning("api_workflow.metrics is set but prometheus_client is not installed")
+            _settings['warned'] = True
+        metrics = False
+    if metrics:
+        _register_metrics()
+    _settings['metrics'] = metrics
+
+
+def metrics_enabled():
+    """True when the Prometheus counters are on"""
+    return _settings['metrics']
+
+
+def enabled():
+    """True when request traces are consumed by the debug log or the metrics"""
+    return _settings['metrics'] or _logger.isEnabledFor(logging.DEBUG)
+
+
+def exposition():
+    """
+    (body, content type) of the metrics in the Prometheus text format.
+    With PROMETHEUS_MULTIPROC_DIR set, the counters of every worker
+    process are merged, not only those of the one serving the scrape.
+    """
+    registry = prometheus_client.REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def _register_metrics():
+    with _metrics_lock:
+        if _metrics:
+            return
+        _metrics['requests'] = prometheus_client.Counter(
+            'api_workflow_requests', 'HTTP requests issued by workflow nodes', ['method', 'host', 'status'])
+        _metrics['errors'] = prometheus_client.Counter(
+            'api_workflow_request_errors', 'Workflow requests that raised before a response', ['method', 'host', 'error_type'])
+        _metrics['duration'] = prometheus_client.Histogram(
+            'api_workflow_request_duration_seconds', 'End to end workflow request time', ['method', 'host'])
+        _metrics['phase'] = prometheus_client.Histogram(
+            'api_workflow_request_phase_seconds', 'Workflow request time per phase', ['phase'])
+
+
+def redact_url(url):
+    """url with the values of credential-looking query parameters masked"""
+    if not url or '?' not in url:
+        return url
+    parsed = urlparse(url)
+    query = [(name, '***' if SENSITIVE_PARAM.search(name) else value)
+             for name, value in parse_qsl(parsed.query, keep_blank_values=True)]
+    return parsed._replace(query=urlencode(query, safe='*')).geturl()
+
+
+class RequestTrace:
+    """
+    Wall clock of one request split into phases (milliseconds):
+    prepare (auth, URL, cache lookup), connect (DNS + TCP) and tls for
+    new connections only, first_byte (request sent until response
+    headers), download (body read).
+    """
+    __slots__ = ('method', 'url', 'phases', 'started', 'mark')
+
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+        self.phases = {}
+        self.started = self.mark = time.perf_counter()
+
+    def phase(self, name):
+        """Book the time since the previous phase under name"""
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + (now - self.mark) * 1000.0
+        self.mark = now
+
+    def responded(self):
+        """Response headers are in: the send time minus connection setup is time to first byte"""
+        now = time.perf_counter()
+        elapsed = (now - self.mark) * 1000.0
+        self.phases['first_byte'] = max(elapsed - self.phases.get('connect', 0.0) - self.phases.get('tls', 0.0), 0.0)
+        self.mark = now
+
+    def finish(self, status_code=None, error=None, cache=None):
+        """Emit the log record and metrics; returns the phase timings"""
+        total = (time.perf_counter() - self.started) * 1000.0
+        if getattr(_local, 'trace', None) is self:
+            _local.trace = None
+        timings = {name: round(value, 3) for name, value in self.phases.items()}
+        timings['total'] = round(total, 3)
+        host = urlparse(self.url).netloc
+        error_type = type(error).__name__ if error is not None else None
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug(
+                "%s %s -> %s in %.1f ms", self.method, redact_url(self.url), status_code or error_type or cache, total,
+                extra={'api_workflow_request': {
+                    'method': self.method,
+                    'host': host,
+                    'status_code': status_code,
+                    'error_type': error_type,
+                    'cache': cache,
+                    'timings_ms': timings,
+                }})
+        if _settings['metrics'] and _metrics:
+            if error_type:
+                _metrics['errors'].labels(self.method, host, error_type).inc()
+            else:
+                _metrics['requests'].labels(self.method, host, str(status_code or cache)).inc()
+                _metrics['duration'].labels(self.method, host).observe(total / 1000.0)
+                for name, value in self.phases.items():
+                    _metrics['phase'].labels(name).observe(value / 1000.0)
+        return timings
+
+
+class _NullTrace:
+    """Stand-in used while instrumentation is disabled, every call is a no-op"""
+    __slots__ = ()
+
+    def phase(self, name):
+        pass
+
+    def responded(self):
+        pass
+
+    def finish(self, status_code=None, error=None, cache=None):
+        return None
+
+
+NULL_TRACE = _NullTrace()
+
+
+def start(method, url):
+    """Trace for a request about to be made on this thread"""
+    if not enabled():
+        return NULL_TRACE
+    trace = _local.trace = RequestTrace(method, url)
+    return trace
+
+
+def connections_opened():
+    """Connections the pooled adapters opened on this thread so far"""
+    return getattr(_local, 'connections', 0)
+
+
+def _count_connection():
+    _local.connections = connections_opened() + 1
+
+
+def _book_connection_phase(name, started):
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.phases[name] = trace.phases.get(name, 0.0) + (time.perf_counter() - started) * 1000.0
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        _count_connection()
+        started = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _book_connection_phase('connect', started)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        _count_connection()
+        started = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _book_connection_phase('connect', started)
+
+    def connect(self):
+        trace = getattr(_local, 'trace', None)
+        connect_before = trace.phases.get('connect', 0.0) if trace is not None else 0.0
+        started = time.perf_counter()
+        super().connect()
+        if trace is not None:
+            # connect() = DNS + TCP (booked by _new_conn) + TLS handshake
+            handshake = (time.perf_counter() - started) * 1000.0 - (trace.phases.get('connect', 0.0) - connect_before)
+            trace.phases['tls'] = trace.phases.get('tls', 0.0) + max(handshake, 0.0)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+# Installed on every pooled adapter: they count new connections, and time them while a request is traced
+POOL_CLASSES_BY_SCHEME = {
+    'http': TimedHTTPConnectionPool,
+    'https': TimedHTTPSConnectionPool,
+}
@@ -0,0 +1,130 @@
+""" Paced, concurrent replay of a request sequence with latency statistics """
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+# Upper bounds (ms) of the latency histogram buckets, the last one is open
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+TIMEOUT_ERROR_TYPES = ('Timeout', 'ConnectTimeout', 'ReadTimeout')
+
+
+class Pacer:
+    """
+    Hands out request start slots at a fixed target rate shared by all
+    workers; returns False once the deadline is reached.
+    """
+
+    def __init__(self, target_rps, deadline):
+        self.interval = 1.0 / target_rps if target_rps else 0.0
+        self.deadline = deadline
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            slot = max(self.next_slot, time.monotonic())
+            self.next_slot = slot + self.interval
+        if slot >= self.deadline:
+            return False
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+
+class LoadStats:
+    """Thread safe accumulator of request outcomes"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.status_codes = {}
+        self.errors = {}
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.iterations = 0
+
+    def record(self, result):
+        latency_ms = (result.get('response_time') or 0.0) * 1000.0
+        failed = result.get('status') != 'success'
+        error_type = result.get('error_type') or (f"HTTP {result.get('status_code')}" if failed else None)
+        with self.lock:
+            self.requests += 1
+            if result.get('status_code'):
+                key = str(result['status_code'])
+                self.status_codes[key] = self.status_codes.get(key, 0) + 1
+            if failed:
+                self.failures += 1
+                self.errors[error_type] = self.errors.get(error_type, 0) + 1
+                if error_type in TIMEOUT_ERROR_TYPES:
+                    self.timeouts += 1
+                    return
+            self.latencies.append(latency_ms)
+            self.histogram[bisect_left(HISTOGRAM_BUCKETS_MS, latency_ms)] += 1
+
+    def report(self, elapsed, target_rps):
+        with self.lock:
+            latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)]
+
+        bounds = [str(bound) for bound in HISTOGRAM_BUCKETS_MS] + ['+Inf']
+        return {
+            'iterations': self.iterations,
+            'requests': self.requests,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'duration': round(elapsed, 3),
+            'target_rps': target_rps,
+            'throughput_rps': round(self.requests / elapsed, 2) if elapsed else 0.0,
+            'latency_ms': {
+                'min': latencies[0] if latencies else None,
+                'mean': sum(latencies) / len(latencies) if latencies else None,
+                'p50': percentile(0.50),
+                'p90': percentile(0.90),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99),
+                'max': latencies[-1] if latencies else None,
+            },
+            'histogram': [{'le_ms': bound, 'count': count} for bound, count in zip(bounds, self.histogram)],
+            'status_codes': self.status_codes,
+            'errors': self.errors,
+        }
+
+
+def run_load(sequence, execute, concurrency, target_rps, duration, iterations=0):
+    """
+    Replay sequence (the API requests of one workflow iteration, in order)
+    from `concurrency` virtual users until duration seconds have passed or
+    `iterations` full iterations have started, whichever comes first.
+    Every request waits for a pacer slot so the combined rate stays at
+    target_rps (0 = unthrottled). execute(item) must return a result dict.
+    """
+    stats = LoadStats()
+    if not sequence:
+        return stats.report(0.0, target_rps)
+    started = time.monotonic()
+    pacer = Pacer(target_rps, started + duration)
+    counter_lock = threading.Lock()
+
+    def virtual_user():
+        while True:
+            with counter_lock:
+                if iterations and stats.iterations >= iterations:
+                    return
+                stats.iterations += 1
+            for item in sequence:
+                if not pacer.wait():
+                    return
+                stats.record(execute(item))
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='api_workflow_load') as executor:
+        for future in [executor.submit(virtual_user) for _i in range(concurrency)]:
+            future.result()
+    return stats.report(time.monotonic() - started, target_rps)
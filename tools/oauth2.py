@@ -0,0 +1,137 @@
+""" OAuth2 client-credentials tokens, cached per client and scope for every run in the worker """
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+from requests.auth import HTTPBasicAuth
+
+from . import http_pool
+
+# Node config keys of the oauth2 auth type
+OAUTH2_CONFIG_KEYS = ('tokenUrl', 'clientId', 'clientSecret', 'scope', 'clientAuthMethod')
+# Assumed lifetime of a token whose response has no expires_in
+DEFAULT_EXPIRES_IN = 3600
+# Refresh this long before expiry (capped to a tenth of short lifetimes)
+EXPIRY_MARGIN = 60
+MAX_CACHED_TOKENS = 256
+DEFAULT_TOKEN_TIMEOUT = 10
+
+_tokens = OrderedDict()
+# One lock per credentials key: the thread holding it fetches, the others wait for its token
+_fetch_locks = {}
+_lock = threading.Lock()
+_stats = {'fetches': 0, 'hits': 0}
+
+
+class OAuth2Error(Exception):
+    """The token endpoint refused the credentials or gave an unusable answer"""
+
+
+class Token:
+    __slots__ = ('access_token', 'token_type', 'refresh_at')
+
+    def __init__(self, access_token, token_type, expires_in):
+        self.access_token = access_token
+        self.token_type = token_type or 'Bearer'
+        self.refresh_at = time.monotonic() + expires_in - min(EXPIRY_MARGIN, expires_in / 10.0)
+
+    @property
+    def fresh(self):
+        return time.monotonic() < self.refresh_at
+
+    @property
+    def header(self):
+        # Some servers answer "bearer", the header scheme is case insensitive but not every API knows it
+        scheme = 'Bearer' if self.token_type.lower() == 'bearer' else self.token_type
+        return f'{scheme} {self.access_token}'
+
+
+def cache_key(config):
+    """Token cache key of a node config; the secret only enters hashed"""
+    secret = hashlib.sha256((config.get('clientSecret') or '').encode()).hexdigest()
+    return (config.get('tokenUrl') or '', config.get('clientId') or '', secret,
+            ' '.join(sorted((config.get('scope') or '').split())))
+
+
+def _fetch(config, timeout, send):
+    data = {'grant_type': 'client_credentials'}
+    if config.get('scope'):
+        data['scope'] = config['scope']
+    auth = None
+    if config.get('clientAuthMethod') == 'body':
+        data.update(client_id=config.get('clientId') or '', client_secret=config.get('clientSecret') or '')
+    else:
+        # client_secret_basic, the method every server has to support
+        auth = HTTPBasicAuth(config.get('clientId') or '', config.get('clientSecret') or '')
+    response = send('POST', config['tokenUrl'], data=data, auth=auth, timeout=timeout,
+                    headers={'Accept': 'application/json'})
+    try:
+        payload = response.json()
+    except ValueError:
+        payload = {}
+    if not response.ok or not payload.get('access_token'):
+        error = (payload.get('error_description') or payload.get('error')
+                 or (f'HTTP {response.status_code}' if not response.ok else 'no access_token in the response'))
+        raise OAuth2Error(f"Token request to {config['tokenUrl']} failed: {error}")
+    try:
+        expires_in = max(float(payload.get('expires_in') or DEFAULT_EXPIRES_IN), 1.0)
+    except (TypeError, ValueError):
+        expires_in = DEFAULT_EXPIRES_IN
+    return Token(payload['access_token'], payload.get('token_type'), expires_in)
+
+
+def get_token(config, timeout=DEFAULT_TOKEN_TIMEOUT, send=None):
+    """
+    Cached token for the credentials of config, fetched when missing or
+    about to expire. Concurrent callers needing the same token wait for a
+    single token request instead of each sending their own. The token
+    request goes through send(method, url, **kwargs), http_pool.request
+    by default.
+    """
+    if not config.get('tokenUrl'):
+        raise OAuth2Error("OAuth2 auth needs a token URL")
+    key = cache_key(config)
+    with _lock:
+        token = _tokens.get(key)
+        if token is not None and token.fresh:
+            _tokens.move_to_end(key)
+            _stats['hits'] += 1
+            return token
+        fetch_lock = _fetch_locks.setdefault(key, threading.Lock())
+    with fetch_lock:
+        # Another thread may have fetched it while we waited
+        with _lock:
+            token = _tokens.get(key)
+            if token is not None and token.fresh:
+                _stats['hits'] += 1
+                return token
+            _stats['fetches'] += 1
+        token = _fetch(config, timeout, send or http_pool.request)
+        with _lock:
+            _tokens[key] = token
+            _tokens.move_to_end(key)
+            while len(_tokens) > MAX_CACHED_TOKENS:
+                stale_key, _token = _tokens.popitem(last=False)
+                _fetch_locks.pop(stale_key, None)
+        return token
+
+
+def invalidate(config, header=None):
+    """
+    Drop the cached token of config, e.g. after the API answered 401.
+    With the rejected Authorization header given, the token is only
+    dropped if it still is the cached one, so one refreshed in the
+    meantime survives.
+    """
+    key = cache_key(config)
+    with _lock:
+        token = _tokens.get(key)
+        if token is not None and (header is None or token.header == header):
+            del _tokens[key]
+
+
+def stats():
+    """Token fetches and cache hits since the worker started"""
+    with _lock:
+        return dict(_stats, cached=len(_tokens))
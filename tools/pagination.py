@@ -0,0 +1,213 @@
+""" Lazy page iteration for paginated APIs, summarised instead of kept in memory """
+from urllib.parse import urljoin, urlencode, urlparse, parse_qsl
+from requests.structures import CaseInsensitiveDict
+from requests.utils import parse_header_links
+import queue
+import threading
+
+from .templating import compile_path, lookup, MISSING
+
+PAGINATION_TYPES = ('next_link', 'cursor', 'offset')
+DEFAULT_MAX_PAGES = 10
+# Hard cap whatever the node says, a paginate node runs inside a web or cron worker
+MAX_PAGES = 1000
+DEFAULT_PAGE_SIZE = 100
+# Keys probed for the items of a page when no itemsPath is configured
+DEFAULT_ITEM_KEYS = ('items', 'data', 'results', 'records')
+SAMPLE_ITEMS = 3
+
+
+class Page:
+    """One fetched page; data and items are dropped by the summary once counted"""
+    __slots__ = ('number', 'url', 'status_code', 'headers', 'data', 'items', 'size', 'latency')
+
+    def __init__(self, number, url, status_code, headers, data, items, size, latency):
+        self.number = number
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.data = data
+        self.items = items
+        self.size = size
+        self.latency = latency
+
+
+def _int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def with_params(url, params):
+    """url with params set in its query string (replacing existing values)"""
+    parsed = urlparse(url)
+    query = [(key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True) if key not in params]
+    query += [(key, str(value)) for key, value in params.items()]
+    return parsed._replace(query=urlencode(query)).geturl()
+
+
+class Paginator:
+    """
+    Follows the pages of a paginate node config:
+        paginationType  next_link (Link header or nextPath), cursor, offset
+        itemsPath       where the items of a page are, e.g. $.results
+        nextPath        body path of the next page URL (next_link)
+        cursorPath      body path of the next cursor, cursorParam its query param (cursor)
+        offsetParam, limitParam, pageSize                                  (offset)
+        maxPages, maxItems  stop after this many pages / items (0 = no item limit)
+    """
+
+    def __init__(self, config):
+        self.kind = config.get('paginationType') or 'next_link'
+        if self.kind not in PAGINATION_TYPES:
+            raise ValueError(f"Unknown pagination type: {self.kind}")
+        self.items_path = compile_path(config['itemsPath']) if config.get('itemsPath') else None
+        self.next_path = compile_path(config['nextPath']) if config.get('nextPath') else None
+        self.cursor_path = compile_path(config.get('cursorPath') or '$.next_cursor')
+        self.cursor_param = config.get('cursorParam') or 'cursor'
+        self.offset_param = config.get('offsetParam') or 'offset'
+        self.limit_param = config.get('limitParam') or 'limit'
+        self.page_size = max(_int(config.get('pageSize'), DEFAULT_PAGE_SIZE), 1)
+        self.max_pages = min(max(_int(config.get('maxPages'), DEFAULT_MAX_PAGES), 1), MAX_PAGES)
+        self.max_items = max(_int(config.get('maxItems'), 0), 0)
+
+    def first_url(self, url):
+        if self.kind == 'offset':
+            return with_params(url, {self.offset_param: 0, self.limit_param: self.page_size})
+        return url
+
+    def items_of(self, data):
+        if self.items_path is not None:
+            items = lookup(data, self.items_path)
+        elif isinstance(data, dict):
+            items = next((data[key] for key in DEFAULT_ITEM_KEYS if isinstance(data.get(key), list)), MISSING)
+        else:
+            items = data
+        return items if isinstance(items, list) else []
+
+    def next_url(self, page, items):
+        if self.kind == 'next_link':
+            if self.next_path is not None:
+                link = lookup(page.data, self.next_path)
+            else:
+                link = next((item.get('url') for item in parse_header_links(page.headers.get('Link') or '')
+                             if (item.get('rel') or '').lower() == 'next'), None)
+            return urljoin(page.url, link) if link and link is not MISSING else None
+        if self.kind == 'cursor':
+            cursor = lookup(page.data, self.cursor_path)
+            if cursor in (None, '', MISSING):
+                return None
+            return with_params(page.url, {self.cursor_param: cursor})
+        # offset: a short page is the last one
+        if len(items) < self.page_size:
+            return None
+        offset = _int(dict(parse_qsl(urlparse(page.url).query)).get(self.offset_param), 0)
+        return with_params(page.url, {self.offset_param: offset + self.page_size})
+
+    def pages(self, url, fetch):
+        """
+        Generator of Page objects, fetching each page only when asked for
+        it and stopping at the last page or at maxPages/maxItems.
+        fetch(url) -> (status_code, headers, data, size, latency seconds).
+        The reason it stopped is left in self.stopped.
+        """
+        self.stopped = 'end'
+        url = self.first_url(url)
+        total_items = 0
+        number = 0
+        while url:
+            number += 1
+            status_code, headers, data, size, latency = fetch(url)
+            # Header names are case-insensitive, whatever the fetch returned them in
+            page = Page(number, url, status_code, CaseInsensitiveDict(headers or {}), data, self.items_of(data),
+                        size or 0, latency or 0.0)
+            total_items += len(page.items)
+            url = self.next_url(page, page.items)
+            yield page
+            if url and number >= self.max_pages:
+                self.stopped = 'max_pages'
+                return
+            if url and self.max_items and total_items >= self.max_items:
+                self.stopped = 'max_items'
+                return
+
+
+_DONE = object()
+
+
+def prefetched(pages):
+    """
+    Run a page generator one page ahead on a helper thread, so the next
+    page is on its way while the current one is processed. Exceptions
+    raised while fetching are re-raised to the consumer.
+    """
+    ready = queue.Queue(maxsize=1)
+    cancelled = threading.Event()
+
+    def offer(item):
+        # Give up once the consumer went away, it will never take the item
+        while not cancelled.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for page in pages:
+                if not offer((page, None)):
+                    return
+            offer((_DONE, None))
+        except Exception as e:
+            offer((_DONE, e))
+
+    producer = threading.Thread(target=produce, name='api_workflow_prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            page, error = ready.get()
+            if error is not None:
+                raise error
+            if page is _DONE:
+                return
+            yield page
+    finally:
+        cancelled.set()
+        producer.join()
+
+
+def summarize(pages):
+    """
+    Consume pages into an aggregate: page/item/byte counts and latency
+    per page, plus a few sample items of the first page. Page bodies are
+    released as soon as they have been counted.
+    """
+    summary = {'pages': 0, 'items': 0, 'bytes': 0, 'per_page': [], 'sample': [], 'last_status_code': None}
+    latencies = []
+    for page in pages:
+        summary['pages'] += 1
+        summary['items'] += len(page.items)
+        summary['bytes'] += page.size
+        summary['last_status_code'] = page.status_code
+        latency_ms = round(page.latency * 1000.0, 3)
+        latencies.append(latency_ms)
+        summary['per_page'].append({
+            'page': page.number,
+            'items': len(page.items),
+            'bytes': page.size,
+            'latency_ms': latency_ms,
+            'status_code': page.status_code,
+        })
+        if page.number == 1:
+            summary['sample'] = page.items[:SAMPLE_ITEMS]
+        page.data = page.items = None
+    summary['latency_ms'] = {
+        'total': round(sum(latencies), 3),
+        'min': min(latencies) if latencies else None,
+        'max': max(latencies) if latencies else None,
+        'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+    }
+    return summary
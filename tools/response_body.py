@@ -0,0 +1,86 @@
+""" Size capped, streaming reads of HTTP response bodies """
+import json
+import tempfile
+
+DEFAULT_MAX_BODY_BYTES = 1024 * 1024
+DEFAULT_PREVIEW_CHARS = 2048
+CHUNK_SIZE = 64 * 1024
+
+
+class ResponseBody:
+    """
+    Outcome of reading a streamed response: at most max_bytes kept in
+    memory, the body size and, when spooling was requested, the temp file
+    holding the complete body.
+    """
+    __slots__ = ('content', 'size', 'truncated', 'spool_path', 'encoding')
+
+    def __init__(self, content, size, truncated, spool_path, encoding):
+        self.content = content
+        self.size = size
+        self.truncated = truncated
+        self.spool_path = spool_path
+        self.encoding = encoding
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def data(self):
+        """Parsed JSON for complete bodies, text otherwise (truncated bodies never parse)"""
+        if not self.truncated:
+            try:
+                return json.loads(self.text)
+            except ValueError:
+                pass
+        return self.text
+
+    def preview(self, max_chars=DEFAULT_PREVIEW_CHARS):
+        text = self.text
+        return text if len(text) <= max_chars else text[:max_chars] + '…'
+
+
+def read_body(response, max_bytes=DEFAULT_MAX_BODY_BYTES, spool=False):
+    """
+    Read a response opened with stream=True chunk by chunk. Reading stops
+    once max_bytes are buffered unless spool is set, in which case the rest
+    is streamed to a temp file and its path returned: the caller owns, and
+    must remove, that file.
+    """
+    buffer = bytearray()
+    size = 0
+    truncated = False
+    spool_file = None
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if not chunk:
+                continue
+            size += len(chunk)
+            if spool_file is not None:
+                spool_file.write(chunk)
+                continue
+            room = max_bytes - len(buffer)
+            buffer += chunk[:room]
+            if len(chunk) > room:
+                truncated = True
+                if not spool:
+                    break
+                spool_file = tempfile.NamedTemporaryFile(prefix='api_workflow_', suffix='.body', delete=False)
+                spool_file.write(buffer)
+                spool_file.write(chunk[room:])
+    finally:
+        if spool_file is not None:
+            spool_file.close()
+        # Closing releases (or discards, if unread data remains) the pooled connection
+        response.close()
+    if truncated and spool_file is None:
+        # Reading stopped early, trust the declared length when there is one
+        try:
+            size = max(size, int(response.headers.get('Content-Length') or 0))
+        except ValueError:
+            pass
+    return ResponseBody(
+        bytes(buffer), size, truncated,
+        spool_file.name if spool_file is not None else None,
+        response.encoding,
+    )
@@ -0,0 +1,109 @@
+""" Bounded LRU cache of GET responses with TTL and conditional revalidation """
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+class CacheEntry:
+    __slots__ = ('status_code', 'headers', 'data', 'size', 'expires_at', 'etag', 'last_modified')
+
+    def __init__(self, status_code, headers, data, size, ttl):
+        self.status_code = status_code
+        self.headers = headers
+        self.data = data
+        self.size = size
+        self.expires_at = time.monotonic() + ttl
+        # Header names are case insensitive: servers send ETag, Etag or etag
+        validators = {key.lower(): value for key, value in headers.items()
+                      if key.lower() in ('etag', 'last-modified')}
+        self.etag = validators.get('etag')
+        self.last_modified = validators.get('last-modified')
+
+    @property
+    def fresh(self):
+        return time.monotonic() < self.expires_at
+
+    def refresh(self, ttl):
+        self.expires_at = time.monotonic() + ttl
+
+    def conditional_headers(self):
+        """Validators to send when revalidating a stale entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Thread safe LRU keyed by request fingerprint, bounded by both entry
+    count and total body bytes.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def configure(self, max_entries=None, max_bytes=None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max(int(max_entries), 1)
+            if max_bytes is not None:
+                self.max_bytes = max(int(max_bytes), 0)
+            self._evict()
+
+    def get(self, key):
+        """Return the entry for key, fresh or stale, marking it recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+
+
+def fingerprint(url, headers=None, auth=None):
+    """
+    Stable cache key for a GET: the final URL plus every request header and
+    the basic auth credentials, hashed so secrets are never kept in clear.
+    """
+    payload = json.dumps({
+        'url': url,
+        'headers': sorted((str(k).lower(), str(v)) for k, v in (headers or {}).items()),
+        'auth': [getattr(auth, 'username', None), getattr(auth, 'password', None)] if auth else None,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# Shared by every request made in this worker process
+response_cache = ResponseCache()
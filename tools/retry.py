@@ -0,0 +1,97 @@
+""" Per-node retry policies and request timeouts """
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import random
+import time
+
+# Node timeouts are configured in milliseconds, like in the builder
+DEFAULT_TIMEOUT_MS = 10000
+DEFAULT_RETRY_STATUSES = (429, 502, 503, 504)
+DEFAULT_BACKOFF_MS = 500
+DEFAULT_BACKOFF_MAX_MS = 10000
+# A Retry-After further away than this is not waited for
+MAX_RETRY_AFTER = 60
+
+
+class DeadlineExceeded(Exception):
+    """The workflow deadline passed before the request could be (re)sent"""
+
+
+def _int(value, default):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def timeout_seconds(config, deadline=None):
+    """
+    requests timeout (seconds) for a node: its `timeout` in milliseconds,
+    clamped to the time left before deadline (a time.monotonic() value).
+    Raises DeadlineExceeded when no time is left.
+    """
+    timeout = max(_int(config.get('timeout'), DEFAULT_TIMEOUT_MS), 1) / 1000.0
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("Workflow deadline exceeded")
+        timeout = min(timeout, remaining)
+    return timeout
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date), None if unusable"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RetryPolicy:
+    """
+    Retry settings of one node config:
+        retryMax         attempts in total, 1 (the default) means no retry
+        retryStatuses    comma separated status codes worth retrying
+        retryBackoff     first backoff step in ms, doubled on every attempt
+        retryBackoffMax  cap of a backoff step in ms
+    Connection errors and timeouts are retried as well.
+    """
+    __slots__ = ('attempts', 'statuses', 'backoff', 'backoff_max')
+
+    def __init__(self, attempts=1, statuses=DEFAULT_RETRY_STATUSES,
+                 backoff_ms=DEFAULT_BACKOFF_MS, backoff_max_ms=DEFAULT_BACKOFF_MAX_MS):
+        self.attempts = max(attempts, 1)
+        self.statuses = frozenset(statuses)
+        self.backoff = max(backoff_ms, 0) / 1000.0
+        self.backoff_max = max(backoff_max_ms, 0) / 1000.0
+
+    @classmethod
+    def from_config(cls, config):
+        statuses = config.get('retryStatuses')
+        if isinstance(statuses, str):
+            statuses = [_int(code, None) for code in statuses.replace(';', ',').split(',') if code.strip()]
+        return cls(
+            attempts=_int(config.get('retryMax'), 1),
+            statuses=[code for code in statuses if code] if statuses else DEFAULT_RETRY_STATUSES,
+            backoff_ms=_int(config.get('retryBackoff'), DEFAULT_BACKOFF_MS),
+            backoff_max_ms=_int(config.get('retryBackoffMax'), DEFAULT_BACKOFF_MAX_MS),
+        )
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait before attempt + 1 (attempt counts from 1): the
+        server's Retry-After when given, otherwise exponential backoff with
+        full jitter. None when Retry-After asks for more than MAX_RETRY_AFTER.
+        """
+        if retry_after is not None:
+            return retry_after if retry_after <= MAX_RETRY_AFTER else None
+        step = min(self.backoff * (2 ** (attempt - 1)), self.backoff_max)
+        return random.uniform(0, step)
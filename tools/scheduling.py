@@ -0,0 +1,27 @@
+""" Fixed-phase scheduling of monitor runs, spread across their interval """
+from datetime import datetime, timezone
+import math
+
+# Knuth's multiplicative hash constant, consecutive ids land far apart
+_GOLDEN = 2654435761
+
+
+def phase_offset(key, interval_seconds):
+    """
+    Seconds into every interval at which the monitor `key` (an integer,
+    e.g. the record id) runs. Monitors sharing an interval get offsets
+    spread across it instead of all firing at its start.
+    """
+    interval_seconds = max(int(interval_seconds), 1)
+    return (int(key) * _GOLDEN % 2 ** 32) * interval_seconds // 2 ** 32
+
+
+def next_run(now, interval_seconds, offset):
+    """
+    First time strictly after now (a naive UTC datetime, like Odoo's) that
+    falls `offset` seconds into an interval, as a naive UTC datetime.
+    """
+    interval_seconds = max(int(interval_seconds), 1)
+    timestamp = now.replace(tzinfo=timezone.utc).timestamp()
+    slot = math.floor((timestamp - offset) / interval_seconds) * interval_seconds + offset + interval_seconds
+    return datetime.fromtimestamp(slot, timezone.utc).replace(tzinfo=None, microsecond=0)
@@ -0,0 +1,344 @@
+""" {{ }} templates and JSONPath-style extraction for passing data between nodes """
+from functools import lru_cache
+from urllib.parse import quote
+import json
+import re
+
+TEMPLATE = re.compile(r'\{\{\s*(.*?)\s*\}\}')
+PATH_TOKEN = re.compile(r"""\.?([A-Za-z_][\w-]*)|\[(\d+|\*)\]|\[["']([^"']+)["']\]""")
+WILDCARD = '*'
+# Parts of a node result a {{node_x....}} template can read
+NODE_FIELDS = ('data', 'status_code', 'headers')
+
+
+class TemplateError(ValueError):
+    """A template or path that cannot be parsed or resolved"""
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
+@lru_cache(maxsize=4096)
+def compile_path(expression):
+    """
+    Parse `$.items[0].id`, `items[*].id` or `data['some key']` into a tuple
+    of keys, list indexes and WILDCARD. A leading `$` is optional.
+    """
+    text = expression.strip()
+    if text.startswith('$'):
+        text = text[1:]
+    path = []
+    position = 0
+    while position < len(text):
+        match = PATH_TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise TemplateError(f"Invalid path: {expression}")
+        name, index, quoted = match.groups()
+        if name is not None:
+            path.append(name)
+        elif index is not None:
+            path.append(WILDCARD if index == WILDCARD else int(index))
+        else:
+            path.append(quoted)
+        position = match.end()
+    return tuple(path)
+
+
+def lookup(value, path):
+    """Value at path inside value, MISSING when any step is absent"""
+    for position, step in enumerate(path):
+        if step == WILDCARD:
+            if not isinstance(value, list):
+                return MISSING
+            rest = path[position + 1:]
+            return [item for item in (lookup(element, rest) for element in value) if item is not MISSING]
+        if isinstance(value, dict):
+            value = value.get(step, MISSING) if not isinstance(step, int) else value.get(str(step), MISSING)
+        elif isinstance(value, list) and isinstance(step, int):
+            value = value[step] if -len(value) <= step < len(value) else MISSING
+        else:
+            return MISSING
+        if value is MISSING:
+            return MISSING
+    return value
+
+
+class Template:
+    """
+    A compiled string with {{ reference }} placeholders. A template that
+    is nothing but one placeholder renders to the referenced value itself
+    (keeping numbers, lists...), any other to a string.
+    """
+    __slots__ = ('text', 'parts', 'refs')
+
+    def __init__(self, text):
+        self.text = text
+        self.parts = []
+        self.refs = []
+        position = 0
+        for match in TEMPLATE.finditer(text):
+            if match.start() > position:
+                self.parts.append(text[position:match.start()])
+            path = compile_path(match.group(1))
+            if not path or not isinstance(path[0], str):
+                raise TemplateError(f"Invalid template reference: {match.group(0)}")
+            self.parts.append(path)
+            self.refs.append(path)
+            position = match.end()
+        if position < len(text):
+            self.parts.append(text[position:])
+
+    @property
+    def single(self):
+        return len(self.parts) == 1 and bool(self.refs)
+
+    def render(self, resolve, encode=str):
+        """resolve(path) gives a reference's value; encode turns values into text when interpolated"""
+        if self.single:
+            return resolve(self.parts[0])
+        return ''.join(part if isinstance(part, str) else _to_text(resolve(part), encode) for part in self.parts)
+
+
+def _to_text(value, encode):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return encode(json.dumps(value))
+    return encode(value)
+
+
+def _url_value(value):
+    # Percent-encoded whole, a value cannot add path segments or query parameters
+    return quote(str(value), safe='')
+
+
+@lru_cache(maxsize=4096)
+def compile_template(text):
+    """Compiled Template for text, or None when it has no placeholder"""
+    if not text or '{{' not in text:
+        return None
+    template = Template(text)
+    return template if template.refs else None
+
+
+class BodyTemplate:
+    """
+    A compiled JSON request body. Placeholders inside JSON strings are
+    rendered in place (a string that is only a placeholder takes the
+    value's own type); a body that is not valid JSON until rendered, e.g.
+    {"id": {{node_1.data.id}}}, gets JSON encoded values substituted.
+    """
+    __slots__ = ('structure', 'text_template', 'in_string', 'refs')
+
+    def __init__(self, text):
+        self.structure = self.text_template = None
+        try:
+            self.structure = _compile_structure(json.loads(text))
+            self.refs = _structure_refs(self.structure)
+        except json.JSONDecodeError:
+            self.text_template = Template(text)
+            self.refs = self.text_template.refs
+            # Placeholders between JSON quotes are escaped into the string,
+            # the others replaced by the JSON encoded value
+            self.in_string = []
+            quoted = escaped = False
+            for part in self.text_template.parts:
+                if not isinstance(part, str):
+                    self.in_string.append(quoted)
+                    continue
+                for char in part:
+                    if escaped:
+                        escaped = False
+                    elif char == '\\':
+                        escaped = quoted
+                    elif char == '"':
+                        quoted = not quoted
+
+    def render(self, resolve):
+        """The body as data (a JSON value), or text when it still is not JSON"""
+        if self.structure is not None:
+            return _render_structure(self.structure, resolve)
+        flags = iter(self.in_string)
+        text = ''.join(
+            part if isinstance(part, str)
+            else json.dumps(_to_text(resolve(part), str))[1:-1] if next(flags)
+            else json.dumps(resolve(part))
+            for part in self.text_template.parts
+        )
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return text
+
+
+def _compile_structure(value):
+    if isinstance(value, str):
+        return compile_template(value) or value
+    if isinstance(value, list):
+        return [_compile_structure(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _compile_structure(item) for key, item in value.items()}
+    return value
+
+
+def _structure_refs(value):
+    if isinstance(value, Template):
+        return list(value.refs)
+    if isinstance(value, list):
+        return [ref for item in value for ref in _structure_refs(item)]
+    if isinstance(value, dict):
+        return [ref for item in value.values() for ref in _structure_refs(item)]
+    return []
+
+
+def _render_structure(value, resolve):
+    if isinstance(value, Template):
+        return value.render(resolve)
+    if isinstance(value, list):
+        return [_render_structure(item, resolve) for item in value]
+    if isinstance(value, dict):
+        return {key: _render_structure(item, resolve) for key, item in value.items()}
+    return value
+
+
+@lru_cache(maxsize=1024)
+def compile_body(text):
+    """Compiled BodyTemplate for a request body, or None when it has no placeholder"""
+    if not text or not isinstance(text, str) or '{{' not in text:
+        return None
+    body = BodyTemplate(text)
+    return body if body.refs else None
+
+
+def node_key(node_id):
+    """Templates may spell node-3 as node_3"""
+    return str(node_id).replace('-', '_')
+
+
+class RunScope:
+    """
+    Values available to the templates of one run. Only what the run's
+    templates reference, and the `extract` variables, is kept from each
+    response; bodies themselves are not held on to.
+        wanted: {node_key: set of paths into the node result view}
+    """
+
+    def __init__(self, wanted=None):
+        self.wanted = wanted or {}
+        self.values = {}
+        self.variables = {}
+        self.done = set()
+
+    def capture(self, node_id, result, extract=()):
+        """Keep the referenced parts of a finished node's result; extract is a list of (name, path)"""
+        key = node_key(node_id)
+        self.done.add(key)
+        paths = self.wanted.get(key)
+        if not paths and not extract:
+            return
+        view = {
+            'data': result.get('response_data'),
+            'status_code': result.get('status_code'),
+            'headers': result.get('headers') or {},
+        }
+        for path in paths or ():
+            self.values[(key, path)] = lookup(view, path)
+        for name, path in extract:
+            # Extraction paths are relative to the response body, like JSONPath's $
+            self.variables[name] = lookup(view['data'], path)
+
+    def resolve(self, path):
+        root, rest = path[0], path[1:]
+        key = node_key(root)
+        if key in self.done and rest and rest[0] in NODE_FIELDS:
+            value = self.values.get((key, rest), MISSING)
+        elif key in self.done and root not in self.variables:
+            raise TemplateError(f"Use {root}.data, {root}.status_code or {root}.headers")
+        elif root in self.variables:
+            value = lookup(self.variables[root], rest)
+        elif key in self.wanted or rest[:1] and rest[0] in NODE_FIELDS:
+            raise TemplateError(f"{root} has not run before this node")
+        else:
+            raise TemplateError(f"Unknown template variable: {root}")
+        if value is MISSING:
+            raise TemplateError(f"Nothing at {root}{_path_text(rest)}")
+        return value
+
+
+def _path_text(path):
+    return ''.join(f'[{step}]' if isinstance(step, int) else f'.{step}' for step in path)
+
+
+def compile_extract(config):
+    """[(name, path)] from a node's `extract` list of {'key': name, 'value': path}"""
+    extract = []
+    for item in config.get('extract') or []:
+        if not isinstance(item, dict):
+            raise TemplateError(f"Invalid extract entry: {item!r}")
+        name, path = item.get('key'), item.get('value')
+        if not name or not path:
+            continue
+        if not isinstance(name, str) or not isinstance(path, str):
+            raise TemplateError(f"Extract entries need a text name and path: {name!r}: {path!r}")
+        extract.append((name, compile_path(path)))
+    return extract
+
+
+def wanted_paths(configs):
+    """{node_key: paths} of the node results referenced by the templates of configs"""
+    wanted = {}
+    for config in configs:
+        for ref in config_refs(config):
+            if len(ref) > 1 and ref[1] in NODE_FIELDS:
+                wanted.setdefault(node_key(ref[0]), set()).add(ref[1:])
+    return wanted
+
+
+def config_refs(config):
+    """Every template reference in a resolved API node config"""
+    refs = []
+    for text in [config.get('url')] + [item.get('value') for key in ('params', 'headers')
+                                       for item in config.get(key) or []]:
+        template = compile_template(text) if isinstance(text, str) else None
+        if template:
+            refs.extend(template.refs)
+    body = compile_body(config.get('body'))
+    if body:
+        refs.extend(body.refs)
+    return refs
+
+
+def render_config(config, resolve):
+    """
+    Copy of a resolved API node config with its url, params, headers and
+    body rendered. Values interpolated into the url are percent-encoded,
+    a url that is a single placeholder is taken as is. The config is
+    returned as is when it has no template.
+    """
+    rendered = None
+    template = compile_template(config.get('url')) if isinstance(config.get('url'), str) else None
+    if template:
+        rendered = dict(config)
+        rendered['url'] = str(template.render(resolve, _url_value))
+    for key in ('params', 'headers'):
+        items = config.get(key) or []
+        if any(compile_template(item.get('value')) for item in items if isinstance(item.get('value'), str)):
+            rendered = rendered or dict(config)
+            rendered[key] = [
+                {**item, 'value': _to_text(compile_template(item['value']).render(resolve), str)}
+                if isinstance(item.get('value'), str) and compile_template(item['value']) else item
+                for item in items
+            ]
+    body = compile_body(config.get('body'))
+    if body:
+        rendered = rendered or dict(config)
+        # Already data: _prepare_request_data passes it through without parsing
+        rendered['body'] = body.render(resolve)
+    return rendered or config
@@ -0,0 +1,78 @@
+""" Per-record cache of parsed and validated workflow documents """
+from collections import OrderedDict
+import json
+import threading
+
+from .workflow_graph import WorkflowGraph
+
+DEFAULT_MAX_ENTRIES = 128
+
+
+class CompiledWorkflow:
+    """
+    A parsed workflow_data document with its validation outcome and a
+    lazily built node index. Treat data as read-only, it is shared.
+    """
+    __slots__ = ('data', 'error', '_graph')
+
+    def __init__(self, data, error=None):
+        self.data = data
+        self.error = error
+        self._graph = None
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = WorkflowGraph(self.data)
+        return self._graph
+
+
+def compile_workflow(raw):
+    """Parse and validate a workflow_data string"""
+    if not raw:
+        return CompiledWorkflow({}, "No workflow data")
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as e:
+        return CompiledWorkflow({}, f"Invalid workflow data format: {e}")
+    if not isinstance(data, dict) or not data.get('nodes'):
+        return CompiledWorkflow(data if isinstance(data, dict) else {}, "Workflow must contain at least one node")
+    return CompiledWorkflow(data)
+
+
+class WorkflowCache:
+    """
+    Bounded LRU holding one compiled version per (database, record id);
+    an entry is only served while the record's write_date still matches.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, dbname, record_id, write_date):
+        key = (dbname, record_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != write_date:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, dbname, record_id, write_date, compiled):
+        key = (dbname, record_id)
+        with self._lock:
+            self._entries[key] = (write_date, compiled)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, dbname, record_ids):
+        with self._lock:
+            for record_id in record_ids:
+                self._entries.pop((dbname, record_id), None)
+
+
+# Shared by every request made in this worker process
+workflow_cache = WorkflowCache()
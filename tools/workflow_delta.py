@@ -0,0 +1,87 @@
+""" Incremental edits of a parsed workflow document """
+
+DELTA_OPS = ('add_node', 'update_node', 'remove_node', 'add_connection', 'remove_connection', 'set_metadata')
+
+
+def apply_delta(data, ops):
+    """
+    Return a new workflow document with ops applied, leaving data
+    untouched. Unchanged nodes and connections are shared with data, so
+    the cost is a shallow copy of both lists plus the changed items.
+    Raises ValueError on an unknown op or a reference to a missing node.
+
+    Supported ops:
+        {'op': 'add_node', 'node': {...}}
+        {'op': 'update_node', 'node': {...}}       (replaces the node with that id)
+        {'op': 'remove_node', 'id': ...}           (drops its connections too)
+        {'op': 'add_connection', 'connection': {...}}
+        {'op': 'remove_connection', 'id': ...}
+        {'op': 'set_metadata', 'metadata': {...}}
+    """
+    nodes = list(data.get('nodes', []))
+    connections = list(data.get('connections', []))
+    metadata = data.get('metadata')
+    node_index = {node.get('id'): position for position, node in enumerate(nodes)}
+    removed_nodes = set()
+    removed_connections = set()
+
+    for op in ops:
+        kind = op.get('op')
+        if kind not in DELTA_OPS:
+            raise ValueError(f"Unknown workflow delta operation: {kind}")
+
+        if kind in ('add_node', 'update_node'):
+            node = op.get('node') or {}
+            node_id = node.get('id')
+            if node_id is None:
+                raise ValueError(f"{kind} requires a node with an id")
+            exists = node_id in node_index and node_id not in removed_nodes
+            if kind == 'add_node' and exists:
+                raise ValueError(f"Node {node_id} already exists")
+            if kind == 'update_node' and not exists:
+                raise ValueError(f"Node {node_id} does not exist")
+            if kind == 'add_node' and node_id not in node_index:
+                node_index[node_id] = len(nodes)
+                nodes.append(node)
+            else:
+                # Updates, and re-adds of a node removed earlier in this delta, reuse its slot
+                removed_nodes.discard(node_id)
+                nodes[node_index[node_id]] = node
+
+        elif kind == 'remove_node':
+            node_id = op.get('id')
+            if node_id not in node_index or node_id in removed_nodes:
+                raise ValueError(f"Node {node_id} does not exist")
+            removed_nodes.add(node_id)
+
+        elif kind == 'add_connection':
+            connection = op.get('connection') or {}
+            for end in ('source', 'target'):
+                if connection.get(end) not in node_index or connection.get(end) in removed_nodes:
+                    raise ValueError(f"Connection {connection.get('id')} references missing node {connection.get(end)}")
+            if connection.get('id') in removed_connections:
+                # Re-added after a removal in this delta: drop the old copy now
+                removed_connections.discard(connection.get('id'))
+                connections = [conn for conn in connections if conn.get('id') != connection.get('id')]
+            connections.append(connection)
+
+        elif kind == 'remove_connection':
+            removed_connections.add(op.get('id'))
+
+        elif kind == 'set_metadata':
+            metadata = op.get('metadata')
+
+    if removed_nodes:
+        nodes = [node for node in nodes if node.get('id') not in removed_nodes]
+    if removed_nodes or removed_connections:
+        connections = [
+            conn for conn in connections
+            if conn.get('id') not in removed_connections
+            and conn.get('source') not in removed_nodes
+            and conn.get('target') not in removed_nodes
+        ]
+
+    document = {**data, 'nodes': nodes, 'connections': connections}
+    if metadata is not None:
+        document['metadata'] = metadata
+    return document
@@ -0,0 +1,79 @@
+""" Indexed view of a workflow's nodes and connections """
+from collections import defaultdict
+
+
+class WorkflowCycleError(ValueError):
+    """Raised when the connections graph is not acyclic"""
+
+    def __init__(self, node_ids):
+        self.node_ids = node_ids
+        super().__init__(f"Workflow contains a cycle between nodes: {', '.join(map(str, node_ids))}")
+
+
+class WorkflowGraph:
+    """
+    Nodes indexed by id plus successor/predecessor adjacency lists,
+    built once in O(nodes + connections).
+    """
+
+    def __init__(self, workflow_data):
+        self._levels = None
+        self.nodes = {}
+        self.order = []
+        for node in workflow_data.get('nodes', []):
+            node_id = node.get('id')
+            if node_id is None or node_id in self.nodes:
+                continue
+            self.nodes[node_id] = node
+            self.order.append(node_id)
+
+        self.successors = defaultdict(list)
+        self.predecessors = defaultdict(list)
+        seen = set()
+        for conn in workflow_data.get('connections', []):
+            source, target = conn.get('source'), conn.get('target')
+            # Ignore dangling or duplicate edges left behind by the builder
+            if source not in self.nodes or target not in self.nodes or (source, target) in seen:
+                continue
+            seen.add((source, target))
+            self.successors[source].append(target)
+            self.predecessors[target].append(source)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def first_of_type(self, node_type):
+        """Return the first node of the given type in document order"""
+        return next((self.nodes[i] for i in self.order if self.nodes[i].get('type') == node_type), None)
+
+    def levels(self):
+        """
+        Topologically sort the graph (Kahn's algorithm) into levels of nodes
+        whose predecessors all belong to earlier levels. Within a level the
+        document order of nodes is kept. Raises WorkflowCycleError if some
+        nodes can never become ready. The graph is never mutated after
+        construction, so the result is computed once and reused.
+        """
+        if self._levels is None:
+            self._levels = self._sort_levels()
+        return self._levels
+
+    def _sort_levels(self):
+        position = {node_id: index for index, node_id in enumerate(self.order)}
+        in_degree = {node_id: len(self.predecessors[node_id]) for node_id in self.order}
+        ready = [node_id for node_id in self.order if not in_degree[node_id]]
+        levels = []
+        visited = 0
+        while ready:
+            levels.append(ready)
+            visited += len(ready)
+            next_ready = []
+            for node_id in ready:
+                for target in self.successors[node_id]:
+                    in_degree[target] -= 1
+                    if not in_degree[target]:
+                        next_ready.append(target)
+            ready = sorted(next_ready, key=position.__getitem__)
+        if visited != len(self.order):
+            raise WorkflowCycleError([node_id for node_id in self.order if in_degree[node_id]])
+        return levels